@@ -6,7 +6,8 @@ from database import get_password_hash
 
 def authenticate_user(username, password, selected_role=None):
     """Authenticate user with username and password - restrict to assigned role only"""
-    user = get_user_by_username(username)
+    # Read the row directly so password changes, deactivation and new accounts apply at once
+    user = get_user_by_username.uncached(username)
     if user:
         password_hash = get_password_hash(password)
         if user["password_hash"] == password_hash:
@@ -430,4 +430,44 @@ def create_interactive_case_button(case, button_text="View Case", key_suffix="")
             
             with col2:
                 show_standardized_case_history(case_id)
-                show_standardized_documents(case_id)
\ No newline at end of file
+                show_standardized_documents(case_id)
+def show_paged_case_table(current_user, panel_type="default", status=None, created_by=None,
+                          search_term=None, filters=None, page_size=None, render=None):
+    """
+    Display one keyset page of cases with Previous/Next navigation
+
+    Queue panels pass status/created_by, search views pass search_term and
+    filters; only the current page is read from the database. Page tokens
+    are kept in session state per panel and reset when the query changes.
+    render defaults to show_expandable_case_table.
+    """
+    from models import get_cases_page, search_cases_page, DEFAULT_PAGE_SIZE
+
+    page_size = page_size or DEFAULT_PAGE_SIZE
+    render = render or show_expandable_case_table
+    state_key = f"case_pages_{panel_type}"
+    query = (status, created_by, search_term, repr(sorted((filters or {}).items())), page_size)
+    if st.session_state.get(f"{state_key}_query") != query:
+        st.session_state[f"{state_key}_query"] = query
+        st.session_state[state_key] = [None]  # Token for each visited page; None is the first
+    tokens = st.session_state[state_key]
+
+    if search_term:
+        cases, next_token = search_cases_page(search_term, filters, page_size=page_size, page_token=tokens[-1])
+    else:
+        cases, next_token = get_cases_page(status, created_by, page_size=page_size, page_token=tokens[-1])
+
+    render([dict(case) for case in cases], current_user, panel_type)
+
+    if len(tokens) > 1 or next_token:
+        col_prev, col_page, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            if len(tokens) > 1 and st.button("⬅️ Previous", key=f"{state_key}_prev"):
+                tokens.pop()
+                st.rerun()
+        with col_page:
+            st.caption(f"Page {len(tokens)}")
+        with col_next:
+            if next_token and st.button("Next ➡️", key=f"{state_key}_next"):
+                tokens.append(next_token)
+                st.rerun()
@@ -1,24 +1,128 @@
 import sqlite3
 import os
+import queue
+import atexit
 import hashlib
+import logging
+import threading
+import time
 from datetime import datetime
 from contextlib import contextmanager
+from query_cache import cached_query, invalidate
 
 DATABASE_PATH = "case_management.db"
 
+# Connection pool tuning (overridable through the environment)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+DB_BUSY_TIMEOUT = float(os.environ.get("DB_BUSY_TIMEOUT", "10"))
+DB_CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", "20000"))
+DB_MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+
 def get_password_hash(password):
     """Generate password hash"""
     return hashlib.sha256(password.encode()).hexdigest()
 
+class ConnectionPool:
+    """Thread-safe pool of configured SQLite connections.
+
+    Connections are opened once with WAL journaling, synchronous=NORMAL,
+    a larger page cache and memory-mapped I/O, then reused across requests.
+    Checkouts never block: when every pooled connection is busy an overflow
+    connection is opened and closed again on release, so nested
+    get_db_connection() calls on the same thread cannot deadlock.
+    """
+
+    def __init__(self, database_path, max_size=DB_POOL_SIZE):
+        self.database_path = database_path
+        self.max_size = max_size
+        self._idle = queue.LifoQueue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _configure(self, conn):
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database_path, timeout=DB_BUSY_TIMEOUT,
+                               check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        self._configure(conn)
+        return conn
+
+    def acquire(self):
+        """Take an idle connection from the pool or open a new one"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn):
+        """Return a connection to the pool, discarding it if unusable"""
+        try:
+            # Never hand a half-finished transaction to the next caller
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.ProgrammingError:
+            return  # Caller closed the connection itself
+
+        with self._lock:
+            if not self._closed:
+                try:
+                    self._idle.put_nowait(conn)
+                    return
+                except queue.Full:
+                    pass
+        conn.close()
+
+    def close_all(self):
+        """Close every idle connection and stop accepting returns"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_connection_pool():
+    """Get the process-wide connection pool for DATABASE_PATH"""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.database_path != DATABASE_PATH:
+            if _pool is not None:
+                _pool.close_all()
+            _pool = ConnectionPool(DATABASE_PATH)
+        return _pool
+
+def close_db_pool():
+    """Close all pooled connections (called automatically at exit)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+            _pool = None
+
+atexit.register(close_db_pool)
+
 @contextmanager
 def get_db_connection():
-    """Database connection context manager"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
+    """Database connection context manager backed by the connection pool"""
+    pool = get_connection_pool()
+    conn = pool.acquire()
     try:
         yield conn
     finally:
-        conn.close()
+        pool.release(conn)
 
 def init_database():
     """Initialize database with tables and default data"""
@@ -233,48 +337,6 @@ def init_database():
         
         conn.commit()
         
-        # Add new columns to existing users table if they don't exist
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN name TEXT")
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-        
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN team TEXT")
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-        
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN functional_designation TEXT")
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-        
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN referred_by TEXT")
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-        
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN all_roles_access BOOLEAN DEFAULT 0")
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-        
-        # Add missing columns to investigation_details table if they don't exist
-        try:
-            cursor.execute("ALTER TABLE investigation_details ADD COLUMN investigation_findings TEXT")
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-        
-        try:
-            cursor.execute("ALTER TABLE investigation_details ADD COLUMN recommendations TEXT")
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-        
-        try:
-            cursor.execute("ALTER TABLE investigation_details ADD COLUMN risk_assessment TEXT")
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-        
         # Achievement tables
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS achievements (
@@ -303,6 +365,9 @@ def init_database():
         
         conn.commit()
         
+        # Bring older databases up to the current schema
+        run_migrations(conn)
+        
         # Clean up old test users first
         test_users_to_remove = ["initiator", "reviewer", "approver", "legal", "closure", "actioner"]
         for user_id in test_users_to_remove:
@@ -346,66 +411,597 @@ def init_database():
                 ''', (achievement_id, name, description, icon, tier, points, category))
         
         conn.commit()
+        
+        # Default users may have been removed or added above
+        invalidate("user")
+        invalidate("investigator_names")
+
+def _add_column_if_missing(cursor, table, column, definition):
+    """Add a column to a table unless it is already present"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def _migration_user_profile_columns(cursor):
+    """Add profile and access columns to users created by older releases"""
+    _add_column_if_missing(cursor, "users", "name", "TEXT")
+    _add_column_if_missing(cursor, "users", "team", "TEXT")
+    _add_column_if_missing(cursor, "users", "functional_designation", "TEXT")
+    _add_column_if_missing(cursor, "users", "referred_by", "TEXT")
+    _add_column_if_missing(cursor, "users", "all_roles_access", "BOOLEAN DEFAULT 0")
+
+def _migration_investigation_columns(cursor):
+    """Add findings columns to investigation_details created by older releases"""
+    _add_column_if_missing(cursor, "investigation_details", "investigation_findings", "TEXT")
+    _add_column_if_missing(cursor, "investigation_details", "recommendations", "TEXT")
+    _add_column_if_missing(cursor, "investigation_details", "risk_assessment", "TEXT")
+
+def _migration_secondary_indexes(cursor):
+    """Index the columns used by queue panels, case history and lookups"""
+    indexes = [
+        ("idx_cases_status_created_at", "cases (status, created_at)"),
+        ("idx_cases_created_by_created_at", "cases (created_by, created_at)"),
+        ("idx_cases_created_at", "cases (created_at)"),
+        ("idx_cases_customer_pan", "cases (customer_pan)"),
+        ("idx_cases_customer_mobile", "cases (customer_mobile)"),
+        ("idx_case_comments_case_created_at", "case_comments (case_id, created_at)"),
+        ("idx_audit_logs_case_performed_at", "audit_logs (case_id, performed_at)"),
+        ("idx_audit_logs_performed_at", "audit_logs (performed_at)"),
+        ("idx_documents_case_uploaded_at", "documents (case_id, uploaded_at)"),
+        ("idx_case_documents_case_id", "case_documents (case_id)"),
+        ("idx_case_actions_case_created_at", "case_actions (case_id, created_at)"),
+        ("idx_investigation_details_case_id", "investigation_details (case_id)"),
+        ("idx_case_assignments_case_id", "case_assignments (case_id)"),
+        ("idx_agency_responses_case_id", "agency_responses (case_id)"),
+    ]
+    for index_name, definition in indexes:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {definition}")
+    cursor.execute("ANALYZE")
+
+# Columns of cases indexed by the cases_fts full-text table
+CASE_SEARCH_COLUMNS = ["case_id", "lan", "case_description", "customer_name", "branch_location"]
+
+def fts5_available(conn):
+    """Check whether this SQLite build includes the FTS5 extension"""
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA compile_options")
+    return any(row[0] == "ENABLE_FTS5" for row in cursor.fetchall())
+
+def _migration_case_search_index(cursor):
+    """Create the cases_fts full-text index and the triggers keeping it in sync"""
+    if not fts5_available(cursor.connection):
+        return  # search_cases falls back to LIKE matching
+    
+    columns = ", ".join(CASE_SEARCH_COLUMNS)
+    new_values = ", ".join(f"new.{column}" for column in CASE_SEARCH_COLUMNS)
+    old_values = ", ".join(f"old.{column}" for column in CASE_SEARCH_COLUMNS)
+    
+    cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS cases_fts USING fts5(
+            {columns},
+            content='cases',
+            content_rowid='id',
+            prefix='2 3 4'
+        )
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS cases_fts_insert AFTER INSERT ON cases BEGIN
+            INSERT INTO cases_fts (rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS cases_fts_delete AFTER DELETE ON cases BEGIN
+            INSERT INTO cases_fts (cases_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS cases_fts_update AFTER UPDATE OF {columns} ON cases BEGIN
+            INSERT INTO cases_fts (cases_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO cases_fts (rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    ''')
+    cursor.execute("INSERT INTO cases_fts (cases_fts) VALUES ('rebuild')")
+
+# Case columns with per-value counters in case_stats
+CASE_STATS_DIMENSIONS = ["status", "region", "product"]
+
+def _migration_case_stats(cursor):
+    """Create the case_stats counters table and the triggers maintaining it"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS case_stats (
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            case_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dimension, value)
+        )
+    ''')
+    
+    def bump(dimension, value_expr, delta):
+        return f'''
+            INSERT OR IGNORE INTO case_stats (dimension, value, case_count)
+            VALUES ('{dimension}', COALESCE({value_expr}, ''), 0);
+            UPDATE case_stats SET case_count = case_count + ({delta})
+            WHERE dimension = '{dimension}' AND value = COALESCE({value_expr}, '');
+        '''
+    
+    insert_body = bump("total", "'all'", 1)
+    delete_body = bump("total", "'all'", -1)
+    for dimension in CASE_STATS_DIMENSIONS:
+        insert_body += bump(dimension, f"new.{dimension}", 1)
+        delete_body += bump(dimension, f"old.{dimension}", -1)
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS case_stats_update_{dimension}
+            AFTER UPDATE OF {dimension} ON cases
+            WHEN old.{dimension} IS NOT new.{dimension}
+            BEGIN
+                {bump(dimension, f"old.{dimension}", -1)}
+                {bump(dimension, f"new.{dimension}", 1)}
+            END
+        ''')
+    
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS case_stats_insert AFTER INSERT ON cases BEGIN {insert_body} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS case_stats_delete AFTER DELETE ON cases BEGIN {delete_body} END")
+    
+    _rebuild_case_stats(cursor)
 
-def log_audit(case_id, action, details, performed_by):
-    """Log audit trail"""
+def _rebuild_case_stats(cursor):
+    """Recompute every case_stats counter from the cases table"""
+    cursor.execute("DELETE FROM case_stats")
+    cursor.execute("INSERT INTO case_stats (dimension, value, case_count) SELECT 'total', 'all', COUNT(*) FROM cases")
+    for dimension in CASE_STATS_DIMENSIONS:
+        cursor.execute(f'''
+            INSERT INTO case_stats (dimension, value, case_count)
+            SELECT '{dimension}', COALESCE({dimension}, ''), COUNT(*) FROM cases
+            GROUP BY COALESCE({dimension}, '')
+        ''')
+
+def rebuild_case_stats():
+    """Reconcile the case_stats counters with the cases table
+
+    Run from the admin panel or as `python database.py rebuild-case-stats`
+    if the dashboard counters ever drift from the underlying data.
+    """
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO audit_logs (case_id, action, details, performed_by) VALUES (?, ?, ?, ?)",
-            (case_id, action, details, performed_by)
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            _rebuild_case_stats(cursor)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+# Case columns naming the users who handled a case
+CASE_PARTICIPANT_COLUMNS = ["created_by", "reviewed_by", "approved_by", "closed_by"]
+
+def _participant_set(row_alias):
+    """SQL selecting the distinct non-null participants of a trigger row"""
+    selects = " UNION ".join(f"SELECT {row_alias}.{column} AS username" for column in CASE_PARTICIPANT_COLUMNS)
+    return f"SELECT username FROM ({selects}) WHERE username IS NOT NULL"
+
+def _bump_user_case_counts(added_alias, removed_alias, delta):
+    """SQL adjusting user_case_counts for users in one trigger row but not the other"""
+    month = f"strftime('%Y-%m', {added_alias}.created_at)"
+    query = f'''
+        INSERT INTO user_case_counts (username, month, case_count)
+        SELECT username, {month}, {delta} FROM ({_participant_set(added_alias)})
+    '''
+    if removed_alias:
+        query += f" WHERE username NOT IN ({_participant_set(removed_alias)})"
+    else:
+        query += " WHERE 1"
+    query += " ON CONFLICT (username, month) DO UPDATE SET case_count = case_count + excluded.case_count;"
+    return query
+
+def _migration_user_case_counts(cursor):
+    """Create per-user monthly case counters and the triggers maintaining them"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_case_counts (
+            username TEXT NOT NULL,
+            month TEXT NOT NULL,
+            case_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (username, month)
         )
-        conn.commit()
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS user_case_counts_insert AFTER INSERT ON cases BEGIN
+            {_bump_user_case_counts("new", None, 1)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS user_case_counts_delete AFTER DELETE ON cases BEGIN
+            {_bump_user_case_counts("old", None, -1)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS user_case_counts_update
+        AFTER UPDATE OF {", ".join(CASE_PARTICIPANT_COLUMNS)} ON cases BEGIN
+            {_bump_user_case_counts("new", "old", 1)}
+            {_bump_user_case_counts("old", "new", -1)}
+        END
+    ''')
+    _rebuild_user_case_counts(cursor)
 
-def update_case_status(case_id, new_status, updated_by, comments=None):
-    """Update case status"""
+def _rebuild_user_case_counts(cursor):
+    """Recompute user_case_counts from the cases table"""
+    participants = " UNION ".join(
+        f"SELECT {column} AS username, strftime('%Y-%m', created_at) AS month, id FROM cases "
+        f"WHERE {column} IS NOT NULL"
+        for column in CASE_PARTICIPANT_COLUMNS
+    )
+    cursor.execute("DELETE FROM user_case_counts")
+    cursor.execute(f'''
+        INSERT INTO user_case_counts (username, month, case_count)
+        SELECT username, month, COUNT(*) FROM ({participants})
+        GROUP BY username, month
+    ''')
+
+def rebuild_user_case_counts():
+    """Reconcile the user_case_counts counters with the cases table"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        
-        # Update case status
-        update_fields = ["status = ?", "updated_at = CURRENT_TIMESTAMP"]
-        params = [new_status]
-        
-        # Add specific reviewer fields based on status
-        if new_status == "Under Review":
-            update_fields.append("reviewed_by = ?")
-            update_fields.append("reviewed_at = CURRENT_TIMESTAMP")
-            params.append(updated_by)
-        elif new_status == "Approved":
-            update_fields.append("approved_by = ?")
-            update_fields.append("approved_at = CURRENT_TIMESTAMP")
-            params.append(updated_by)
-        elif new_status == "Legal Review":
-            update_fields.append("legal_reviewed_by = ?")
-            update_fields.append("legal_reviewed_at = CURRENT_TIMESTAMP")
-            params.append(updated_by)
-        elif new_status == "Closed":
-            update_fields.append("closed_by = ?")
-            update_fields.append("closed_at = CURRENT_TIMESTAMP")
-            params.append(updated_by)
-        
-        params.append(case_id)
-        
-        cursor.execute(f'''
-            UPDATE cases 
-            SET {", ".join(update_fields)}
-            WHERE case_id = ?
-        ''', params)
-        
-        # Add comment if provided
-        if comments:
-            cursor.execute('''
-                INSERT INTO case_comments (case_id, comment, comment_type, created_by)
-                VALUES (?, ?, ?, ?)
-            ''', (case_id, comments, f"Status Change to {new_status}", updated_by))
-        
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            _rebuild_user_case_counts(cursor)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+def _migration_document_path_indexes(cursor):
+    """Index document file paths so the face index can find the case that owns a file"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_file_path ON documents (file_path)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_case_documents_file_path ON case_documents (file_path)")
+
+# Ordered schema migrations: (version, description, migration function).
+# Append new entries with the next version number; never edit applied ones.
+MIGRATIONS = [
+    (1, "Add user profile and access columns", _migration_user_profile_columns),
+    (2, "Add investigation findings columns", _migration_investigation_columns),
+    (3, "Add secondary indexes for cases, comments and audit logs", _migration_secondary_indexes),
+    (4, "Add full-text search index for cases", _migration_case_search_index),
+    (5, "Add trigger-maintained case_stats dashboard counters", _migration_case_stats),
+    (6, "Add trigger-maintained per-user case counters", _migration_user_case_counts),
+    (7, "Index document file paths", _migration_document_path_indexes),
+]
+
+def get_schema_version(conn):
+    """Get the highest applied schema migration version"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cursor.fetchone()[0]
+
+def run_migrations(conn):
+    """Apply pending schema migrations, each in its own transaction"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+    
+    if get_schema_version(conn) >= MIGRATIONS[-1][0]:
+        return
+    
+    for version, description, migrate in MIGRATIONS:
+        # Take the write lock first so concurrent sessions apply each step once
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            migrate(cursor)
+            cursor.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+# Background audit writer tuning
+AUDIT_ASYNC = os.environ.get("AUDIT_ASYNC", "1") != "0"
+AUDIT_BATCH_SIZE = int(os.environ.get("AUDIT_BATCH_SIZE", "200"))
+AUDIT_FLUSH_INTERVAL = float(os.environ.get("AUDIT_FLUSH_INTERVAL", "0.5"))
+AUDIT_QUEUE_SIZE = int(os.environ.get("AUDIT_QUEUE_SIZE", "10000"))
+
+_AUDIT_INSERT = '''
+    INSERT INTO audit_logs (case_id, action, details, performed_by, performed_at)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+def _audit_timestamp():
+    """Current UTC time in the same format as SQLite CURRENT_TIMESTAMP"""
+    return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+class _FlushRequest:
+    """Queue marker a flush() caller waits on, told whether its rows were committed"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.committed = False
+
+    def release(self, committed):
+        self.committed = committed
+        self.done.set()
+
+class AuditLogWriter:
+    """Queue audit rows in memory and write them in batched transactions.
+
+    A daemon thread drains the queue, committing up to AUDIT_BATCH_SIZE
+    rows at a time or whatever has accumulated after AUDIT_FLUSH_INTERVAL
+    seconds. When the queue is full the row is written synchronously
+    instead of being dropped, and pending rows are flushed at exit. Rows
+    from a failed batch are kept (under _lock, shared by the writer thread
+    and flushing callers) and retried; flush() only reports success once
+    they have been committed.
+    """
+
+    def __init__(self, batch_size=AUDIT_BATCH_SIZE, flush_interval=AUDIT_FLUSH_INTERVAL,
+                 max_queue=AUDIT_QUEUE_SIZE):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._failed = []
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="audit-log-writer",
+                                                daemon=True)
+                self._thread.start()
+
+    def submit(self, row):
+        """Queue an audit row, writing it synchronously if the queue is full"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._write([row])
+
+    def pending(self):
+        """Number of audit rows not yet handed to the writer thread"""
+        with self._lock:
+            return self._queue.qsize() + len(self._failed)
+
+    def flush(self, timeout=5.0):
+        """Block until every row queued so far has been committed.
+
+        Returns False if the rows could not be written (they stay queued
+        for retry) or the writer did not finish within timeout.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return self._drain_inline()
+        request = _FlushRequest()
+        try:
+            self._queue.put(request, timeout=timeout)
+        except queue.Full:
+            return False
+        return request.done.wait(timeout) and request.committed
+
+    def stop(self, timeout=5.0):
+        """Flush pending rows and stop the writer thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self.flush(timeout)
+            self._stopping = True
+            self._queue.put(None)
+            self._thread.join(timeout)
+        self._drain_inline()
+
+    def _drain_inline(self):
+        rows = []
+        waiters = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, _FlushRequest):
+                waiters.append(item)
+            elif item is not None:
+                rows.append(item)
+        committed = self._commit_batch(rows)
+        for waiter in waiters:
+            waiter.release(committed)
+        return committed
+
+    def _write(self, rows):
+        with get_db_connection() as conn:
+            conn.executemany(_AUDIT_INSERT, rows)
+            conn.commit()
+
+    def _has_failed_rows(self):
+        with self._lock:
+            return bool(self._failed)
+
+    def _commit_batch(self, batch):
+        """Write failed rows plus batch; returns whether everything is committed"""
+        with self._lock:
+            rows = self._failed + batch
+            self._failed = []
+        if not rows:
+            return True
+        try:
+            self._write(rows)
+        except sqlite3.Error as e:
+            # Keep the rows, ahead of any that failed concurrently, and retry with the next batch
+            logging.error(f"Audit log batch write of {len(rows)} rows failed, will retry: {e}")
+            with self._lock:
+                self._failed = rows + self._failed
+            return False
+        return True
+
+    def _run(self):
+        while not self._stopping:
+            batch = []
+            waiters = []
+            # Rows from a failed write are retried after one interval even if nothing new arrives
+            deadline = time.monotonic() + self.flush_interval if self._has_failed_rows() else None
+            while len(batch) < self.batch_size:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    break
+                if isinstance(item, _FlushRequest):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            committed = self._commit_batch(batch)
+            for waiter in waiters:
+                waiter.release(committed)
+
+_audit_writer = AuditLogWriter()
+
+def flush_audit_log(timeout=5.0):
+    """Wait until all queued audit rows are committed; False if they were not"""
+    return _audit_writer.flush(timeout)
+
+atexit.register(_audit_writer.stop)
+
+def log_audit(case_id, action, details, performed_by, conn=None):
+    """Log audit trail
+
+    When a connection is passed the row joins the caller's transaction and
+    is committed together with it; status transitions and case creation
+    log this way. Otherwise the row is queued for the background writer,
+    or committed immediately when AUDIT_ASYNC is disabled.
+    """
+    row = (case_id, action, details, performed_by, _audit_timestamp())
+    
+    if conn is not None:
+        conn.execute(_AUDIT_INSERT, row)
+        return
+    
+    if AUDIT_ASYNC:
+        _audit_writer.submit(row)
+        return
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_AUDIT_INSERT, row)
         conn.commit()
+
+# Actor/timestamp columns stamped when a case enters a given status
+STATUS_ACTOR_FIELDS = {
+    "Under Review": ("reviewed_by", "reviewed_at"),
+    "Approved": ("approved_by", "approved_at"),
+    "Legal Review": ("legal_reviewed_by", "legal_reviewed_at"),
+    "Closed": ("closed_by", "closed_at"),
+}
+
+def _build_status_update(new_status):
+    """Build the UPDATE statement for a transition into new_status.
+
+    Parameters are (new_status, updated_by, case_id) when the status stamps
+    an actor column, otherwise (new_status, case_id).
+    """
+    update_fields = ["status = ?", "updated_at = CURRENT_TIMESTAMP"]
+    stamps_actor = new_status in STATUS_ACTOR_FIELDS
+    if stamps_actor:
+        actor_field, timestamp_field = STATUS_ACTOR_FIELDS[new_status]
+        update_fields.append(f"{actor_field} = ?")
+        update_fields.append(f"{timestamp_field} = CURRENT_TIMESTAMP")
+    
+    query = f'''
+        UPDATE cases 
+        SET {", ".join(update_fields)}
+        WHERE case_id = ?
+    '''
+    return query, stamps_actor
+
+def transition_case_status(case_id, new_status, updated_by, comments=None):
+    """Move a case to a new status in a single transaction.
+
+    The status update, optional comment and audit row are written on one
+    connection and committed together, so a transition either fully
+    happens or leaves no trace.
+    """
+    query, stamps_actor = _build_status_update(new_status)
+    params = (new_status, updated_by, case_id) if stamps_actor else (new_status, case_id)
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params)
+            
+            # Add comment if provided
+            if comments:
+                cursor.execute('''
+                    INSERT INTO case_comments (case_id, comment, comment_type, created_by)
+                    VALUES (?, ?, ?, ?)
+                ''', (case_id, comments, f"Status Change to {new_status}", updated_by))
+            
+            log_audit(case_id, "Status Update", f"Status changed to: {new_status}", updated_by, conn=conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
         
-        # Log audit
-        log_audit(case_id, "Status Update", f"Status changed to: {new_status}", updated_by)
-        
+        invalidate("case", case_id)
+        invalidate("case_comments", case_id)
         return True
 
+def bulk_transition_case_status(case_ids, new_status, updated_by, comments=None):
+    """Move many cases to a new status in a single transaction.
+
+    Returns the number of case rows updated.
+    """
+    case_ids = list(dict.fromkeys(case_ids))
+    if not case_ids:
+        return 0
+    
+    query, stamps_actor = _build_status_update(new_status)
+    if stamps_actor:
+        update_params = [(new_status, updated_by, case_id) for case_id in case_ids]
+    else:
+        update_params = [(new_status, case_id) for case_id in case_ids]
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.executemany(query, update_params)
+            updated = cursor.rowcount
+            
+            if comments:
+                cursor.executemany('''
+                    INSERT INTO case_comments (case_id, comment, comment_type, created_by)
+                    VALUES (?, ?, ?, ?)
+                ''', [(case_id, comments, f"Status Change to {new_status}", updated_by)
+                      for case_id in case_ids])
+            
+            performed_at = _audit_timestamp()
+            cursor.executemany(
+                _AUDIT_INSERT,
+                [(case_id, "Status Update", f"Status changed to: {new_status}", updated_by, performed_at)
+                 for case_id in case_ids]
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        
+        for case_id in case_ids:
+            invalidate("case", case_id)
+            invalidate("case_comments", case_id)
+        return updated
+
+def update_case_status(case_id, new_status, updated_by, comments=None):
+    """Update case status"""
+    return transition_case_status(case_id, new_status, updated_by, comments)
+
 def add_case_comment(case_id, comment, created_by, comment_type="General"):
     """Add comment to a case"""
     with get_db_connection() as conn:
@@ -415,10 +1011,12 @@ def add_case_comment(case_id, comment, created_by, comment_type="General"):
             VALUES (?, ?, ?, ?)
         ''', (case_id, comment, comment_type, created_by))
         conn.commit()
+        invalidate("case_comments", case_id)
         
         # Log audit
         log_audit(case_id, "Comment Added", f"Comment type: {comment_type}", created_by)
 
+@cached_query("investigator_names", ttl=300)
 def get_investigator_names():
     """Get all active user names for investigator assignment dropdowns"""
     with get_db_connection() as conn:
@@ -430,3 +1028,17 @@ def get_investigator_names():
         ''')
         users = cursor.fetchall()
         return [user['name'] for user in users]
+
+if __name__ == "__main__":
+    import sys
+    
+    if sys.argv[1:] == ["rebuild-case-stats"]:
+        init_database()
+        rebuild_case_stats()
+        print("case_stats rebuilt")
+    elif sys.argv[1:] == ["rebuild-user-counters"]:
+        init_database()
+        rebuild_user_case_counts()
+        print("user_case_counts rebuilt")
+    else:
+        print("Usage: python database.py [rebuild-case-stats | rebuild-user-counters]")
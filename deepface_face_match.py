@@ -5,54 +5,43 @@ from deepface import DeepFace
 from PIL import Image
 import io
 import base64
-import tempfile
 import os
+from face_embeddings import embed_images, get_face_embedding, get_model_threshold, cosine_distance
+from face_model_registry import model_registry, start_model_preload
+from image_ingest import decode_image
 
-def image_to_temp_file(uploaded_file):
-    """Convert uploaded file to temporary file for DeepFace processing"""
+def image_to_array(uploaded_file):
+    """Decode an uploaded file once into a BGR array for DeepFace processing"""
     try:
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-            # Read the uploaded file content
-            image = Image.open(uploaded_file)
-            
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Save to temporary file
-            image.save(tmp_file.name, format='JPEG')
-            return tmp_file.name
+        return decode_image(uploaded_file)
     except Exception as e:
         st.error(f"Error processing image: {str(e)}")
         return None
 
-def compare_faces_deepface(image1_path, image2_path, model_name='VGG-Face'):
+def compare_faces_deepface(image1, image2, model_name='VGG-Face'):
     """
     Compare two faces using DeepFace library
     Available models: VGG-Face, Facenet, OpenFace, DeepFace, DeepID, ArcFace, Dlib, SFace
+    
+    image1 and image2 may be file paths or BGR arrays from image_to_array.
     """
     try:
-        # Verify faces using DeepFace
-        result = DeepFace.verify(
-            img1_path=image1_path,
-            img2_path=image2_path,
-            model_name=model_name,
-            distance_metric='cosine'
-        )
+        # Embed both faces (cached by image content) and compare them
+        embedding1 = get_face_embedding(image1, model_name)
+        embedding2 = get_face_embedding(image2, model_name)
+        distance = cosine_distance(embedding1, embedding2)
+        threshold = get_model_threshold(model_name)
         
-        # Convert distance to confidence percentage
-        distance = result['distance']
         # For cosine distance: lower distance = higher similarity
         confidence = max(0, (1 - distance) * 100)
         
         return {
             'success': True,
-            'verified': result['verified'],
+            'verified': distance <= threshold,
             'confidence': confidence,
             'distance': distance,
             'model_used': model_name,
-            'threshold': result['threshold']
+            'threshold': threshold
         }
         
     except Exception as e:
@@ -110,8 +99,23 @@ def show_deepface_interface():
             help="Different models may give varying results"
         )
     
+    # Start loading the selected model now so it is warm by the time images are uploaded
+    start_model_preload()
+    model_registry.warm_async(selected_model)
+    
     with col_info:
-        st.info(f"Model: {selected_model}")
+        if model_registry.is_ready(selected_model):
+            st.info(f"Model: {selected_model} (loaded)")
+        else:
+            st.info(f"Model: {selected_model} (loading...)")
+    
+    with st.expander("Loaded models"):
+        for entry in model_registry.status():
+            if entry['status'] == 'ready':
+                memory = f"{entry['memory_bytes'] / 1024 / 1024:.0f} MB" if entry.get('memory_bytes') is not None else "n/a"
+                st.write(f"{entry['kind'].title()} **{entry['name']}**: loaded in {entry['load_seconds']}s, {memory}")
+            else:
+                st.write(f"{entry['kind'].title()} **{entry['name']}**: {entry['status']} {entry.get('error', '')}")
     
     # Upload option selection
     upload_mode = st.radio(
@@ -159,66 +163,55 @@ def show_deepface_two_image_comparison(model_name):
     if st.button("🔍 Compare Faces (DeepFace)", type="primary", disabled=(not image1 or not image2)):
         if image1 and image2:
             with st.spinner(f"Processing with {model_name} model..."):
-                # Convert images to temporary files
-                temp_path1 = image_to_temp_file(image1)
-                temp_path2 = image_to_temp_file(image2)
+                # Decode each upload once; arrays go straight to DeepFace
+                image_array1 = image_to_array(image1)
+                image_array2 = image_to_array(image2)
                 
-                if temp_path1 and temp_path2:
-                    try:
-                        # Compare faces
-                        result = compare_faces_deepface(temp_path1, temp_path2, model_name)
-                        analysis = analyze_deepface_result(result)
-                        
-                        # Display results
-                        st.markdown("---")
-                        st.markdown("### 📊 Face Comparison Results")
-                        
-                        # Status indicator
-                        if analysis['match_status'] == 'STRONG_MATCH':
-                            st.success(f"✅ {analysis['message']}")
-                        elif analysis['match_status'] == 'MATCH':
-                            st.success(f"✅ {analysis['message']}")
-                        elif analysis['match_status'] == 'POSSIBLE_MATCH':
-                            st.warning(f"⚠️ {analysis['message']}")
-                        elif analysis['match_status'] == 'NO_MATCH':
-                            st.error(f"❌ {analysis['message']}")
+                if image_array1 is not None and image_array2 is not None:
+                    # Compare faces
+                    result = compare_faces_deepface(image_array1, image_array2, model_name)
+                    analysis = analyze_deepface_result(result)
+                    
+                    # Display results
+                    st.markdown("---")
+                    st.markdown("### 📊 Face Comparison Results")
+                    
+                    # Status indicator
+                    if analysis['match_status'] == 'STRONG_MATCH':
+                        st.success(f"✅ {analysis['message']}")
+                    elif analysis['match_status'] == 'MATCH':
+                        st.success(f"✅ {analysis['message']}")
+                    elif analysis['match_status'] == 'POSSIBLE_MATCH':
+                        st.warning(f"⚠️ {analysis['message']}")
+                    elif analysis['match_status'] == 'NO_MATCH':
+                        st.error(f"❌ {analysis['message']}")
+                    else:
+                        st.error(f"⚠️ {analysis['message']}")
+                    
+                    # Detailed results
+                    col_conf, col_status, col_model = st.columns(3)
+                    
+                    with col_conf:
+                        st.metric("Confidence Score", f"{analysis['confidence']:.1f}%")
+                    
+                    with col_status:
+                        st.metric("Verification", "VERIFIED" if analysis.get('verified', False) else "NOT VERIFIED")
+                    
+                    with col_model:
+                        st.metric("AI Model", model_name)
+                    
+                    # Technical details
+                    with st.expander("🔬 Technical Details"):
+                        if result.get('success'):
+                            st.json({
+                                'model_used': result.get('model_used', model_name),
+                                'distance_score': result.get('distance', 'N/A'),
+                                'threshold_used': result.get('threshold', 'N/A'),
+                                'verification_result': result.get('verified', False),
+                                'confidence_percentage': f"{analysis['confidence']:.2f}%"
+                            })
                         else:
-                            st.error(f"⚠️ {analysis['message']}")
-                        
-                        # Detailed results
-                        col_conf, col_status, col_model = st.columns(3)
-                        
-                        with col_conf:
-                            st.metric("Confidence Score", f"{analysis['confidence']:.1f}%")
-                        
-                        with col_status:
-                            st.metric("Verification", "VERIFIED" if analysis.get('verified', False) else "NOT VERIFIED")
-                        
-                        with col_model:
-                            st.metric("AI Model", model_name)
-                        
-                        # Technical details
-                        with st.expander("🔬 Technical Details"):
-                            if result.get('success'):
-                                st.json({
-                                    'model_used': result.get('model_used', model_name),
-                                    'distance_score': result.get('distance', 'N/A'),
-                                    'threshold_used': result.get('threshold', 'N/A'),
-                                    'verification_result': result.get('verified', False),
-                                    'confidence_percentage': f"{analysis['confidence']:.2f}%"
-                                })
-                            else:
-                                st.error(f"Error: {result.get('error', 'Unknown error')}")
-                        
-                    finally:
-                        # Clean up temporary files
-                        try:
-                            if temp_path1 and os.path.exists(temp_path1):
-                                os.unlink(temp_path1)
-                            if temp_path2 and os.path.exists(temp_path2):
-                                os.unlink(temp_path2)
-                        except:
-                            pass
+                            st.error(f"Error: {result.get('error', 'Unknown error')}")
                 else:
                     st.error("❌ Failed to process uploaded images")
 
@@ -281,156 +274,101 @@ def process_deepface_bulk_comparison(uploaded_files, mode, threshold, show_detai
     st.markdown("---")
     st.markdown("### 📊 Bulk AI Comparison Results")
     
-    # Convert all images to temporary files
-    temp_files = []
+    # Decode every upload once into an array
+    images = []
     file_names = []
     
-    try:
-        for uploaded_file in uploaded_files:
-            temp_path = image_to_temp_file(uploaded_file)
-            if temp_path:
-                temp_files.append(temp_path)
-                file_names.append(uploaded_file.name)
-        
-        if len(temp_files) < 2:
-            st.error("❌ Failed to process images. Please try different images.")
-            return
-        
-        results = []
-        total_comparisons = 0
-        
-        if mode == "Compare all images with first image (1 vs All)":
-            reference_path = temp_files[0]
-            reference_name = file_names[0]
-            
-            st.markdown(f"**Reference Image:** {reference_name}")
+    for uploaded_file in uploaded_files:
+        image_array = image_to_array(uploaded_file)
+        if image_array is not None:
+            images.append(image_array)
+            file_names.append(uploaded_file.name)
+    
+    if len(images) < 2:
+        st.error("❌ Failed to process images. Please try different images.")
+        return
+    
+    # Embed every image once; all modes then read from the distance matrix
+    st.markdown(f"**Embedding {len(images)} images with {model_name}...**")
+    progress_bar = st.progress(0)
+    embedding_set = embed_images(
+        images, file_names, model_name,
+        progress_callback=lambda done, total: progress_bar.progress(done / total)
+    )
+    
+    results = []
+    
+    if mode == "Compare all images with first image (1 vs All)":
+        st.markdown(f"**Reference Image:** {file_names[0]}")
+        pairs = embedding_set.one_vs_all(0)
+    else:
+        pairs = embedding_set.all_pairs()
+    
+    for i, j in pairs:
+        analysis = analyze_deepface_result(embedding_set.compare(i, j))
+        results.append({
+            'pair': f"{file_names[i]} vs {file_names[j]}",
+            'confidence': analysis['confidence'],
+            'match_status': analysis['match_status'],
+            'message': analysis['message'],
+            'verified': analysis.get('verified', False)
+        })
+    total_comparisons = len(pairs)
+    
+    if mode == "Find best matches (Smart Grouping)":
+        best_matches = [r for r in results if r['confidence'] >= threshold]
+        results = sorted(best_matches, key=lambda x: x['confidence'], reverse=True)
+    
+    # Display results
+    if results:
+        for idx, result in enumerate(results):
+            col1, col2, col3, col4 = st.columns([3, 1, 1, 2])
             
-            progress_bar = st.progress(0)
+            with col1:
+                st.write(f"**{result['pair']}**")
             
-            for i in range(1, len(temp_files)):
-                progress_bar.progress(i / (len(temp_files) - 1))
-                
-                result = compare_faces_deepface(reference_path, temp_files[i], model_name)
-                analysis = analyze_deepface_result(result)
-                
-                results.append({
-                    'pair': f"{reference_name} vs {file_names[i]}",
-                    'confidence': analysis['confidence'],
-                    'match_status': analysis['match_status'],
-                    'message': analysis['message'],
-                    'verified': analysis.get('verified', False)
-                })
-                total_comparisons += 1
-        
-        elif mode == "Compare all images pairwise (All vs All)":
-            total_pairs = len(temp_files) * (len(temp_files) - 1) // 2
-            progress_bar = st.progress(0)
-            current_pair = 0
+            with col2:
+                confidence = result['confidence']
+                if confidence >= threshold:
+                    st.success(f"✅ {confidence:.1f}%")
+                else:
+                    st.error(f"❌ {confidence:.1f}%")
             
-            for i in range(len(temp_files)):
-                for j in range(i + 1, len(temp_files)):
-                    progress_bar.progress(current_pair / total_pairs)
-                    
-                    result = compare_faces_deepface(temp_files[i], temp_files[j], model_name)
-                    analysis = analyze_deepface_result(result)
-                    
-                    results.append({
-                        'pair': f"{file_names[i]} vs {file_names[j]}",
-                        'confidence': analysis['confidence'],
-                        'match_status': analysis['match_status'],
-                        'message': analysis['message'],
-                        'verified': analysis.get('verified', False)
-                    })
-                    
-                    current_pair += 1
-                    total_comparisons += 1
-        
-        elif mode == "Find best matches (Smart Grouping)":
-            best_matches = []
-            total_pairs = len(temp_files) * (len(temp_files) - 1) // 2
-            progress_bar = st.progress(0)
-            current_pair = 0
+            with col3:
+                if result.get('verified', False):
+                    st.success("✓ Verified")
+                else:
+                    st.error("✗ Not Verified")
             
-            for i in range(len(temp_files)):
-                for j in range(i + 1, len(temp_files)):
-                    progress_bar.progress(current_pair / total_pairs)
-                    
-                    result = compare_faces_deepface(temp_files[i], temp_files[j], model_name)
-                    analysis = analyze_deepface_result(result)
-                    
-                    if analysis['confidence'] >= threshold:
-                        best_matches.append({
-                            'pair': f"{file_names[i]} vs {file_names[j]}",
-                            'confidence': analysis['confidence'],
-                            'match_status': analysis['match_status'],
-                            'message': analysis['message'],
-                            'verified': analysis.get('verified', False)
-                        })
-                    
-                    current_pair += 1
-                    total_comparisons += 1
+            with col4:
+                st.write(result['message'])
             
-            results = sorted(best_matches, key=lambda x: x['confidence'], reverse=True)
+            if show_details and idx < 5:  # Show details for first 5 results
+                with st.expander(f"Details for {result['pair']}"):
+                    st.json({
+                        'confidence_score': result['confidence'],
+                        'match_status': result['match_status'],
+                        'verified': result.get('verified', False),
+                        'threshold_used': threshold,
+                        'ai_model': model_name,
+                        'analysis': result['message']
+                    })
         
-        # Display results
-        if results:
-            for idx, result in enumerate(results):
-                col1, col2, col3, col4 = st.columns([3, 1, 1, 2])
-                
-                with col1:
-                    st.write(f"**{result['pair']}**")
-                
-                with col2:
-                    confidence = result['confidence']
-                    if confidence >= threshold:
-                        st.success(f"✅ {confidence:.1f}%")
-                    else:
-                        st.error(f"❌ {confidence:.1f}%")
-                
-                with col3:
-                    if result.get('verified', False):
-                        st.success("✓ Verified")
-                    else:
-                        st.error("✗ Not Verified")
-                
-                with col4:
-                    st.write(result['message'])
-                
-                if show_details and idx < 5:  # Show details for first 5 results
-                    with st.expander(f"Details for {result['pair']}"):
-                        st.json({
-                            'confidence_score': result['confidence'],
-                            'match_status': result['match_status'],
-                            'verified': result.get('verified', False),
-                            'threshold_used': threshold,
-                            'ai_model': model_name,
-                            'analysis': result['message']
-                        })
-            
-            # Summary statistics
-            st.markdown("#### 📈 Summary Statistics")
-            matches = len([r for r in results if r['confidence'] >= threshold])
-            verified_matches = len([r for r in results if r.get('verified', False)])
-            avg_confidence = sum(r['confidence'] for r in results) / len(results) if results else 0
-            
-            col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
-            with col_stat1:
-                st.metric("Total Comparisons", total_comparisons)
-            with col_stat2:
-                st.metric("Matches Found", matches)
-            with col_stat3:
-                st.metric("Verified Matches", verified_matches)
-            with col_stat4:
-                st.metric("Average Confidence", f"{avg_confidence:.1f}%")
+        # Summary statistics
+        st.markdown("#### 📈 Summary Statistics")
+        matches = len([r for r in results if r['confidence'] >= threshold])
+        verified_matches = len([r for r in results if r.get('verified', False)])
+        avg_confidence = sum(r['confidence'] for r in results) / len(results) if results else 0
         
-        else:
-            st.warning("⚠️ No matches found above the specified threshold.")
+        col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
+        with col_stat1:
+            st.metric("Total Comparisons", total_comparisons)
+        with col_stat2:
+            st.metric("Matches Found", matches)
+        with col_stat3:
+            st.metric("Verified Matches", verified_matches)
+        with col_stat4:
+            st.metric("Average Confidence", f"{avg_confidence:.1f}%")
     
-    finally:
-        # Clean up temporary files
-        for temp_file in temp_files:
-            try:
-                if os.path.exists(temp_file):
-                    os.unlink(temp_file)
-            except:
-                pass
\ No newline at end of file
+    else:
+        st.warning("⚠️ No matches found above the specified threshold.")
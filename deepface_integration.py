@@ -4,16 +4,20 @@ Provides advanced facial recognition capabilities using multiple deep learning m
 """
 
 import os
-import tempfile
 import streamlit as st
 from PIL import Image
 import io
+from image_ingest import decode_image, INGEST_MAX_DIMENSION
+from face_embeddings import get_face_embedding, get_model_threshold, cosine_distance
+from face_model_registry import start_model_preload
+from face_index import sync_directory_async, search_similar_faces, FACE_INDEX_DETECTOR
 
 # DeepFace imports
 try:
     from deepface import DeepFace
     import cv2
     import numpy as np
+    import pandas as pd
     DEEPFACE_AVAILABLE = True
 except ImportError:
     DEEPFACE_AVAILABLE = False
@@ -26,14 +30,15 @@ class DeepFaceVerification:
         self.default_model = 'VGG-Face'  # Most reliable model
         self.detector_backends = ['opencv', 'ssd', 'dlib', 'mtcnn', 'retinaface', 'mediapipe']
         self.default_detector = 'opencv'
+        self._synced_directories = set()
     
     def verify_faces(self, reference_image, comparison_image, model_name=None, detector_backend=None):
         """
         Verify if two face images belong to the same person
         
         Args:
-            reference_image: PIL Image or file upload object
-            comparison_image: PIL Image or file upload object
+            reference_image: PIL Image, file upload object or BGR array
+            comparison_image: PIL Image, file upload object or BGR array
             model_name: DeepFace model to use (default: VGG-Face)
             detector_backend: Face detection backend (default: opencv)
         
@@ -50,33 +55,25 @@ class DeepFaceVerification:
             model = model_name or self.default_model
             detector = detector_backend or self.default_detector
             
-            # Save images to temporary files for DeepFace processing
-            ref_path = self._save_temp_image(reference_image)
-            comp_path = self._save_temp_image(comparison_image)
+            # Decode each image once into an array for DeepFace processing
+            ref_image = self._load_image(reference_image)
+            comp_image = self._load_image(comparison_image)
             
-            if not ref_path or not comp_path:
+            if ref_image is None or comp_image is None:
                 return {
                     'success': False,
                     'error': 'Failed to process uploaded images'
                 }
             
-            # Perform face verification using DeepFace
-            result = DeepFace.verify(
-                img1_path=ref_path,
-                img2_path=comp_path,
-                model_name=model,
-                detector_backend=detector,
-                distance_metric='cosine',
-                enforce_detection=False
-            )
-            
-            # Clean up temporary files
-            self._cleanup_temp_files([ref_path, comp_path])
+            # Embed both faces; repeat checks of the same photos are served
+            # from the embedding store without running the model again
+            ref_embedding = get_face_embedding(ref_image, model, detector, enforce_detection=False)
+            comp_embedding = get_face_embedding(comp_image, model, detector, enforce_detection=False)
             
             # Process results
-            verified = result.get('verified', False)
-            distance = result.get('distance', 1.0)
-            threshold = result.get('threshold', 0.4)
+            distance = cosine_distance(ref_embedding, comp_embedding)
+            threshold = get_model_threshold(model)
+            verified = distance <= threshold
             
             # Calculate match percentage (higher is better match)
             match_percentage = max(0, (1 - (distance / threshold)) * 100)
@@ -123,7 +120,7 @@ class DeepFaceVerification:
         Analyze facial attributes using DeepFace
         
         Args:
-            image: PIL Image or file upload object
+            image: PIL Image, file upload object or BGR array
             actions: List of analysis actions to perform
         
         Returns:
@@ -136,21 +133,18 @@ class DeepFaceVerification:
             }
         
         try:
-            image_path = self._save_temp_image(image)
-            if not image_path:
+            image_array = self._load_image(image)
+            if image_array is None:
                 return {'success': False, 'error': 'Failed to process image'}
             
             # Perform face analysis
             analysis = DeepFace.analyze(
-                img_path=image_path,
+                img_path=image_array,
                 actions=actions,
                 detector_backend=self.default_detector,
                 enforce_detection=False
             )
             
-            # Clean up
-            self._cleanup_temp_files([image_path])
-            
             # Process results (handle both single face and multiple faces)
             if isinstance(analysis, list):
                 analysis = analysis[0]  # Use first face if multiple detected
@@ -171,43 +165,62 @@ class DeepFaceVerification:
                 'error': f'Face analysis failed: {str(e)}'
             }
     
-    def find_similar_faces(self, target_image, database_path, model_name=None):
+    def find_similar_faces(self, target_image, database_path="uploads", model_name=None, top_k=10, threshold=None):
         """
         Find similar faces in a database of images
         
+        Searches the persistent face index. Images in database_path that
+        were never indexed are queued for background indexing on the first
+        search of that directory, and appear in later searches. The target
+        is embedded the way the index embeds stored images: at full
+        resolution, with FACE_INDEX_DETECTOR and face detection enforced.
+        
         Args:
-            target_image: PIL Image or file upload object
+            target_image: Image path, PIL Image, file upload object or BGR array
             database_path: Path to directory containing face images
             model_name: DeepFace model to use
+            top_k: Maximum number of matches to return
+            threshold: Maximum cosine distance (default: the model's verification threshold)
         
         Returns:
-            dict: Results with similar faces found
+            dict: Results with similar faces found; 'results' is a list holding
+            one DataFrame (identity, case_id, distance, threshold), closest first,
+            as DeepFace.find returns
         """
         if not DEEPFACE_AVAILABLE:
             return {'success': False, 'error': 'DeepFace library not available'}
         
         try:
             model = model_name or self.default_model
-            target_path = self._save_temp_image(target_image)
+            if isinstance(target_image, str):
+                target = target_image
+            else:
+                target = self._load_image(target_image, max_dimension=None)
             
-            if not target_path:
+            if target is None:
                 return {'success': False, 'error': 'Failed to process target image'}
             
-            # Find similar faces
-            results = DeepFace.find(
-                img_path=target_path,
-                db_path=database_path,
-                model_name=model,
-                detector_backend=self.default_detector,
-                enforce_detection=False
-            )
+            try:
+                embedding = get_face_embedding(target, model, FACE_INDEX_DETECTOR, enforce_detection=True)
+            except ValueError as e:
+                return {'success': False, 'error': f'No face detected in target image: {str(e)}'}
             
-            self._cleanup_temp_files([target_path])
+            # Search what is indexed now; unindexed images are backfilled
+            # in the background rather than inside this request
+            if (database_path, model) not in self._synced_directories:
+                sync_directory_async(database_path, model)
+                self._synced_directories.add((database_path, model))
+            matches = search_similar_faces(embedding, model, k=top_k, threshold=threshold, path_prefix=database_path)
+            match_threshold = threshold if threshold is not None else get_model_threshold(model)
+            results = pd.DataFrame(
+                [dict(match, threshold=match_threshold) for match in matches],
+                columns=['identity', 'case_id', 'distance', 'threshold']
+            )
             
             return {
                 'success': True,
-                'matches_found': len(results) if isinstance(results, list) else 0,
-                'results': results,
+                'matches_found': len(results),
+                'results': [results],
                 'model_used': model
             }
             
@@ -217,44 +230,17 @@ class DeepFaceVerification:
                 'error': f'Face search failed: {str(e)}'
             }
     
-    def _save_temp_image(self, image):
-        """Save uploaded image to temporary file for DeepFace processing"""
+    def _load_image(self, image, max_dimension=INGEST_MAX_DIMENSION):
+        """Decode an uploaded image once into a BGR array for DeepFace processing"""
         try:
-            if hasattr(image, 'read'):
-                # File upload object
-                image_bytes = image.read()
-                image.seek(0)  # Reset file pointer
-                pil_image = Image.open(io.BytesIO(image_bytes))
-            elif isinstance(image, Image.Image):
-                # PIL Image
-                pil_image = image
-            else:
-                return None
-            
-            # Convert to RGB if necessary
-            if pil_image.mode != 'RGB':
-                pil_image = pil_image.convert('RGB')
-            
-            # Save to temporary file
-            temp_fd, temp_path = tempfile.mkstemp(suffix='.jpg')
-            os.close(temp_fd)
-            pil_image.save(temp_path, 'JPEG', quality=95)
-            
-            return temp_path
+            if hasattr(image, 'read') or isinstance(image, (Image.Image, bytes, np.ndarray)):
+                return decode_image(image, max_dimension)
+            return None
             
         except Exception as e:
-            st.error(f"Error saving temporary image: {str(e)}")
+            st.error(f"Error loading image: {str(e)}")
             return None
     
-    def _cleanup_temp_files(self, file_paths):
-        """Clean up temporary files"""
-        for path in file_paths:
-            try:
-                if path and os.path.exists(path):
-                    os.unlink(path)
-            except Exception:
-                pass  # Ignore cleanup errors
-    
     def get_available_models(self):
         """Get list of available DeepFace models"""
         return self.models
@@ -266,6 +252,9 @@ class DeepFaceVerification:
 # Global instance for easy access
 deepface_verifier = DeepFaceVerification()
 
+# Load the configured models in the background so the first verification is warm
+start_model_preload()
+
 def perform_deepface_verification(reference_image, comparison_image, model_name=None):
     """
     Convenience function for face verification using DeepFace
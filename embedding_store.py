@@ -0,0 +1,167 @@
+"""
+Embedding Store Module
+Persistent, content-addressed cache of face embeddings keyed by image hash, model and detector
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+
+EMBEDDING_STORE_PATH = os.environ.get("EMBEDDING_STORE_PATH", "face_embeddings.db")
+EMBEDDING_STORE_MAX_BYTES = int(os.environ.get("EMBEDDING_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+def image_digest(image):
+    """
+    SHA-256 of an image's normalized pixels
+
+    Paths, bytes and file-like objects are decoded to RGB (with EXIF
+    orientation applied) before hashing, so the same photo re-uploaded or
+    re-encoded to the same pixels maps to the same digest. Numpy arrays are
+    hashed as-is together with their shape.
+    """
+    if isinstance(image, np.ndarray):
+        pixels = np.ascontiguousarray(image)
+    else:
+        from PIL import Image, ImageOps
+        import io
+
+        if isinstance(image, (bytes, bytearray)):
+            pil_image = Image.open(io.BytesIO(image))
+        elif isinstance(image, Image.Image):
+            pil_image = image
+        else:
+            pil_image = Image.open(image)
+            if hasattr(image, 'seek'):
+                image.seek(0)
+        pil_image = ImageOps.exif_transpose(pil_image)
+        if pil_image.mode != 'RGB':
+            pil_image = pil_image.convert('RGB')
+        pixels = np.asarray(pil_image)
+
+    digest = hashlib.sha256()
+    digest.update(str(pixels.shape).encode())
+    digest.update(str(pixels.dtype).encode())
+    digest.update(pixels.tobytes())
+    return digest.hexdigest()
+
+class EmbeddingStore:
+    """SQLite-backed embedding cache with least-recently-used eviction and a size cap"""
+
+    def __init__(self, path=EMBEDDING_STORE_PATH, max_bytes=EMBEDDING_STORE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    cache_key TEXT PRIMARY KEY,
+                    image_sha256 TEXT NOT NULL,
+                    model_name TEXT NOT NULL,
+                    detector_backend TEXT NOT NULL,
+                    dimensions INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            ''')
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(digest, model_name, detector_backend, enforce_detection=True):
+        """Cache key for an image digest under a given model configuration"""
+        return f"{digest}:{model_name}:{detector_backend}:{int(bool(enforce_detection))}"
+
+    def get(self, digest, model_name, detector_backend, enforce_detection=True):
+        """Return the stored embedding or None, refreshing its LRU position"""
+        key = self.make_key(digest, model_name, detector_backend, enforce_detection)
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT vector FROM embeddings WHERE cache_key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE embeddings SET last_used = ? WHERE cache_key = ?", (time.time(), key))
+            conn.commit()
+        return np.frombuffer(row[0], dtype=np.float32).copy()
+
+    def put(self, digest, model_name, detector_backend, vector, enforce_detection=True):
+        """Store an embedding, evicting the least recently used entries above the size cap"""
+        key = self.make_key(digest, model_name, detector_backend, enforce_detection)
+        blob = np.asarray(vector, dtype=np.float32).tobytes()
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute('''
+                INSERT OR REPLACE INTO embeddings
+                    (cache_key, image_sha256, model_name, detector_backend, dimensions,
+                     vector, size_bytes, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (key, digest, model_name, detector_backend, len(blob) // 4,
+                  blob, len(blob), now, now))
+            self._evict(conn)
+            conn.commit()
+
+    def put_many(self, entries, model_name, detector_backend, enforce_detection=True):
+        """Store several (digest, vector) embeddings in one transaction"""
+        now = time.time()
+        rows = []
+        for digest, vector in entries:
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((self.make_key(digest, model_name, detector_backend, enforce_detection), digest,
+                         model_name, detector_backend, len(blob) // 4, blob, len(blob), now, now))
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.executemany('''
+                INSERT OR REPLACE INTO embeddings
+                    (cache_key, image_sha256, model_name, detector_backend, dimensions,
+                     vector, size_bytes, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% of the cap so eviction does not run on every insert
+        target = int(self.max_bytes * 0.9)
+        rows = conn.execute("SELECT cache_key, size_bytes FROM embeddings ORDER BY last_used ASC")
+        evicted = []
+        for cache_key, size_bytes in rows:
+            if total <= target:
+                break
+            evicted.append((cache_key,))
+            total -= size_bytes
+        conn.executemany("DELETE FROM embeddings WHERE cache_key = ?", evicted)
+
+    def stats(self):
+        """Entry count and total stored bytes"""
+        with self._lock:
+            count, total = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM embeddings"
+            ).fetchone()
+        return {'entries': count, 'size_bytes': total, 'max_bytes': self.max_bytes}
+
+    def clear(self):
+        """Remove every stored embedding"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM embeddings")
+            conn.commit()
+
+# Global instance for easy access
+embedding_store = EmbeddingStore()
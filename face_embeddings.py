@@ -0,0 +1,238 @@
+"""
+Face Embedding Engine
+Embeds each face image once with DeepFace and compares faces with vectorized cosine distances
+"""
+
+import sqlite3
+import logging
+import numpy as np
+from embedding_store import embedding_store, image_digest
+from face_model_registry import model_registry
+from face_worker_pool import parallel_enabled, embed_in_pool
+
+# DeepFace imports
+try:
+    from deepface import DeepFace
+    DEEPFACE_AVAILABLE = True
+except ImportError:
+    DEEPFACE_AVAILABLE = False
+
+# Cosine distance thresholds used by DeepFace.verify, for DeepFace builds
+# that do not expose their own threshold lookup
+COSINE_THRESHOLDS = {
+    'VGG-Face': 0.68,
+    'Facenet': 0.40,
+    'Facenet512': 0.30,
+    'OpenFace': 0.10,
+    'DeepFace': 0.23,
+    'DeepID': 0.015,
+    'ArcFace': 0.68,
+    'Dlib': 0.07,
+    'SFace': 0.593,
+    'GhostFaceNet': 0.65,
+}
+
+def get_model_threshold(model_name, distance_metric='cosine'):
+    """Get the distance threshold DeepFace.verify applies for a model"""
+    try:
+        from deepface.modules.verification import find_threshold
+        return float(find_threshold(model_name, distance_metric))
+    except (ImportError, AttributeError, KeyError):
+        pass
+    try:
+        from deepface.commons.distance import findThreshold
+        return float(findThreshold(model_name, distance_metric))
+    except (ImportError, AttributeError, KeyError):
+        pass
+    return COSINE_THRESHOLDS.get(model_name, 0.40)
+
+def represent_face(image, model_name='VGG-Face', detector_backend='opencv', enforce_detection=True):
+    """
+    Compute the embedding of the most prominent face in an image
+
+    Args:
+        image: Image path or BGR numpy array accepted by DeepFace
+        model_name: DeepFace recognition model
+        detector_backend: Face detection backend
+        enforce_detection: Raise if no face is found
+
+    Returns:
+        np.ndarray: float32 embedding vector
+    """
+    # Waits for an in-flight preload instead of building the network twice
+    model_registry.ensure_detector(detector_backend)
+    model_registry.ensure_model(model_name)
+
+    representations = DeepFace.represent(
+        img_path=image,
+        model_name=model_name,
+        detector_backend=detector_backend,
+        enforce_detection=enforce_detection
+    )
+
+    if isinstance(representations, dict):
+        representations = [representations]
+    if not representations:
+        raise ValueError("No face representation returned")
+
+    def face_area(representation):
+        area = representation.get('facial_area') or {}
+        return area.get('w', 0) * area.get('h', 0)
+
+    best = max(representations, key=face_area)
+    return np.asarray(best['embedding'], dtype=np.float32)
+
+def get_face_embedding(image, model_name='VGG-Face', detector_backend='opencv', enforce_detection=True):
+    """
+    Embedding for an image, served from the persistent embedding store when
+    the same pixels were already embedded with this model and detector
+    """
+    digest = image_digest(image)
+    try:
+        embedding = embedding_store.get(digest, model_name, detector_backend, enforce_detection)
+    except sqlite3.Error as e:
+        logging.warning(f"Embedding store read failed, recomputing: {e}")
+        embedding = None
+    if embedding is None:
+        embedding = represent_face(image, model_name, detector_backend, enforce_detection)
+        try:
+            embedding_store.put(digest, model_name, detector_backend, embedding, enforce_detection)
+        except sqlite3.Error as e:
+            # The embedding is already computed; a busy or locked store must not fail the image
+            logging.error(f"Embedding store write failed: {e}")
+    return embedding
+
+def cosine_distance(embedding1, embedding2):
+    """Cosine distance between two embedding vectors"""
+    return float(cosine_distance_matrix(np.stack([embedding1, embedding2]))[0, 1])
+
+def cosine_distance_matrix(embeddings):
+    """Pairwise cosine distances between the rows of an (n, d) embedding matrix"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    unit = embeddings / np.clip(norms, 1e-12, None)
+    distances = 1.0 - unit @ unit.T
+    return np.clip(distances, 0.0, 2.0)
+
+class FaceEmbeddingSet:
+    """Embeddings for a batch of images with all pairwise distances precomputed"""
+
+    def __init__(self, names, embeddings, errors, model_name, distance_metric='cosine'):
+        """
+        Args:
+            names: Display name for every image, in upload order
+            embeddings: Dict of image index -> embedding vector
+            errors: Dict of image index -> error message for images that failed
+            model_name: DeepFace model that produced the embeddings
+        """
+        self.names = list(names)
+        self.errors = dict(errors)
+        self.model_name = model_name
+        self.threshold = get_model_threshold(model_name, distance_metric)
+
+        n = len(self.names)
+        self.distances = np.full((n, n), np.nan, dtype=np.float32)
+        valid = sorted(embeddings)
+        if valid:
+            matrix = np.stack([embeddings[i] for i in valid])
+            self.distances[np.ix_(valid, valid)] = cosine_distance_matrix(matrix)
+
+    def __len__(self):
+        return len(self.names)
+
+    def compare(self, i, j):
+        """Comparison result for images i and j in the compare_faces_deepface format"""
+        for idx in (i, j):
+            if idx in self.errors:
+                return {
+                    'success': False,
+                    'error': f"DeepFace comparison failed: {self.errors[idx]}"
+                }
+
+        distance = float(self.distances[i, j])
+        return {
+            'success': True,
+            'verified': distance <= self.threshold,
+            'confidence': max(0, (1 - distance) * 100),
+            'distance': distance,
+            'model_used': self.model_name,
+            'threshold': self.threshold
+        }
+
+    def one_vs_all(self, reference=0):
+        """(reference, other) index pairs for 1-vs-All comparison"""
+        return [(reference, j) for j in range(len(self.names)) if j != reference]
+
+    def all_pairs(self):
+        """(i, j) index pairs with i < j for All-vs-All comparison"""
+        n = len(self.names)
+        return [(i, j) for i in range(n) for j in range(i + 1, n)]
+
+def embed_images(images, names, model_name='VGG-Face', detector_backend='opencv',
+                 enforce_detection=True, progress_callback=None):
+    """
+    Embed every image exactly once and precompute their pairwise distances
+
+    Args:
+        images: Image paths or BGR numpy arrays
+        names: Display name for each image
+        model_name: DeepFace recognition model
+        detector_backend: Face detection backend
+        enforce_detection: Fail images without a detectable face
+        progress_callback: Optional callable(done, total) invoked as each image completes
+
+    Images not already in the embedding store are spread over the face
+    worker pool when there are at least FACE_WORKER_MIN_BATCH of them.
+    Workers only compute embeddings; new embeddings are written to the
+    store here, in one batch.
+
+    Returns:
+        FaceEmbeddingSet
+    """
+    embeddings = {}
+    errors = {}
+    digests = {}
+    computed = []
+    done = 0
+
+    def record(idx, embedding, error):
+        nonlocal done
+        if error is None:
+            embeddings[idx] = embedding
+            if idx in digests:
+                computed.append((digests[idx], embedding))
+        else:
+            errors[idx] = error
+        done += 1
+        if progress_callback:
+            progress_callback(done, len(images))
+
+    # Serve repeat images from the store before deciding where to run the model
+    misses = []
+    for idx, image in enumerate(images):
+        digest = image_digest(image)
+        try:
+            embedding = embedding_store.get(digest, model_name, detector_backend, enforce_detection)
+        except sqlite3.Error:
+            embedding = None
+        if embedding is None:
+            digests[idx] = digest
+            misses.append((idx, image))
+        else:
+            record(idx, embedding, None)
+
+    if parallel_enabled(len(misses)):
+        embed_in_pool(misses, model_name, detector_backend, enforce_detection, on_result=record)
+    else:
+        for idx, image in misses:
+            try:
+                record(idx, represent_face(image, model_name, detector_backend, enforce_detection), None)
+            except Exception as e:
+                record(idx, None, str(e))
+
+    try:
+        embedding_store.put_many(computed, model_name, detector_backend, enforce_detection)
+    except sqlite3.Error as e:
+        logging.error(f"Embedding store write failed: {e}")
+
+    return FaceEmbeddingSet(names, embeddings, errors, model_name)
@@ -0,0 +1,406 @@
+"""
+Face Index Module
+Persistent inverted-file (IVF) nearest-neighbour index over embeddings of every uploaded face photo
+"""
+
+import os
+import time
+import queue
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+
+FACE_INDEX_DIR = os.environ.get("FACE_INDEX_DIR", "face_index")
+FACE_INDEX_MODELS = [m.strip() for m in os.environ.get("FACE_INDEX_MODELS", "VGG-Face").split(",") if m.strip()]
+FACE_INDEX_DETECTOR = os.environ.get("FACE_INDEX_DETECTOR", "opencv")
+FACE_INDEX_NPROBE = int(os.environ.get("FACE_INDEX_NPROBE", "16"))
+FACE_INDEX_TRAIN_MIN = int(os.environ.get("FACE_INDEX_TRAIN_MIN", "2048"))
+FACE_INDEX_CACHED_LISTS = int(os.environ.get("FACE_INDEX_CACHED_LISTS", "256"))
+# k-means trains on a sample of this many points per list, capped in total
+FACE_INDEX_TRAIN_POINTS_PER_LIST = int(os.environ.get("FACE_INDEX_TRAIN_POINTS_PER_LIST", "16"))
+FACE_INDEX_TRAIN_SAMPLE_MAX = int(os.environ.get("FACE_INDEX_TRAIN_SAMPLE_MAX", "65536"))
+# Rows per block when assigning vectors to lists, bounding the distance matrix size
+ASSIGN_CHUNK = 4096
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+def _nearest(unit_vectors, centroids):
+    """Index of the closest centroid for each vector, computed in ASSIGN_CHUNK blocks"""
+    return np.concatenate([
+        np.argmax(unit_vectors[start:start + ASSIGN_CHUNK] @ centroids.T, axis=1)
+        for start in range(0, len(unit_vectors), ASSIGN_CHUNK)
+    ])
+
+def _kmeans(sample, nlist, iterations=10, seed=0):
+    """Spherical k-means over unit vectors, returning unit centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)]
+    for _ in range(iterations):
+        assignment = _nearest(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        counts = np.bincount(assignment, minlength=nlist)
+        # Re-seed empty lists from random sample points
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+class FaceIndex:
+    """IVF index for one recognition model, stored in SQLite
+
+    Vectors are kept unit-normalized so cosine distance is 1 - dot product.
+    Until FACE_INDEX_TRAIN_MIN faces are indexed every vector lives in one
+    list and queries are exact; after that the vectors are clustered into
+    roughly 4 * sqrt(n) lists and a query only scans the nprobe lists whose
+    centroids are closest. The clustering is retrained whenever the index
+    has doubled in size since it was last trained. Training runs without
+    holding the index lock, so searches continue against the old lists
+    until the new ones are swapped in.
+    """
+
+    def __init__(self, path, model_name, detector_backend=FACE_INDEX_DETECTOR, nprobe=FACE_INDEX_NPROBE):
+        self.path = path
+        self.model_name = model_name
+        self.detector_backend = detector_backend
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        self._conn = None
+        self._centroids = None
+        self._lists = OrderedDict()
+        self._count = 0
+        self._trained_count = 0
+        self._training = False
+
+    def _connection(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS index_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS centroids (
+                    list_id INTEGER PRIMARY KEY,
+                    centroid BLOB NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS vectors (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    list_id INTEGER NOT NULL DEFAULT 0,
+                    source_path TEXT NOT NULL UNIQUE,
+                    case_id TEXT,
+                    vector BLOB NOT NULL,
+                    added_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_vectors_list_id ON vectors (list_id);
+            ''')
+            self._conn.commit()
+            self._load_centroids()
+            count = self._meta('vector_count')
+            if count is None:
+                # Indexes created before the running count was kept
+                count = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+                self._set_meta('vector_count', count)
+                self._conn.commit()
+            self._count = int(count)
+            self._trained_count = int(self._meta('trained_count', '0'))
+        return self._conn
+
+    def _load_centroids(self):
+        rows = self._conn.execute("SELECT centroid FROM centroids ORDER BY list_id").fetchall()
+        self._centroids = np.stack([np.frombuffer(row[0], dtype=np.float32) for row in rows]) if rows else None
+
+    def _meta(self, key, default=None):
+        row = self._connection().execute("SELECT value FROM index_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self._connection().execute("INSERT OR REPLACE INTO index_meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def __len__(self):
+        with self._lock:
+            self._connection()
+            return self._count
+
+    def contains(self, source_path):
+        """Whether an image path has already been indexed"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT 1 FROM vectors WHERE source_path = ?", (source_path,)
+            ).fetchone()
+            return row is not None
+
+    def _assign(self, unit_vectors):
+        if self._centroids is None:
+            return np.zeros(len(unit_vectors), dtype=np.int64)
+        return _nearest(unit_vectors, self._centroids)
+
+    def add(self, embedding, source_path, case_id=None):
+        """Insert one embedding; re-adding a path replaces its vector"""
+        unit = _normalize(embedding)
+        with self._lock:
+            conn = self._connection()
+            list_id = int(self._assign(unit[None, :])[0])
+            previous = conn.execute("SELECT list_id FROM vectors WHERE source_path = ?", (source_path,)).fetchone()
+            conn.execute('''
+                INSERT OR REPLACE INTO vectors (list_id, source_path, case_id, vector, added_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (list_id, source_path, case_id, unit.tobytes(), time.time()))
+            if previous is None:
+                self._set_meta('vector_count', self._count + 1)
+            conn.commit()
+            if previous is None:
+                self._count += 1
+            self._lists.pop(list_id, None)
+            if previous is not None:
+                self._lists.pop(previous[0], None)
+
+            needs_training = (not self._training and self._count >= FACE_INDEX_TRAIN_MIN
+                              and self._count >= 2 * self._trained_count)
+        if needs_training:
+            self.train()
+
+    def train(self):
+        """
+        Re-cluster the index and reassign every vector to its nearest list
+
+        Sampling, k-means and assignment run on a separate read connection
+        outside the index lock; only writing the new lists and swapping the
+        centroids in happens under it.
+        """
+        with self._lock:
+            self._connection()
+            if self._training or self._count == 0:
+                return
+            self._training = True
+            count = self._count
+        try:
+            reader = sqlite3.connect(self.path)
+            try:
+                nlist = max(1, min(int(4 * np.sqrt(count)), count))
+                sample_size = min(count, max(nlist * FACE_INDEX_TRAIN_POINTS_PER_LIST, 10000),
+                                  FACE_INDEX_TRAIN_SAMPLE_MAX)
+                rows = reader.execute(
+                    "SELECT vector FROM vectors ORDER BY RANDOM() LIMIT ?", (sample_size,)
+                ).fetchall()
+                sample = np.stack([np.frombuffer(row[0], dtype=np.float32) for row in rows])
+                centroids = _kmeans(sample, min(nlist, len(sample)))
+                del sample, rows
+                assignments, last_id = self._assign_all(reader, centroids)
+            finally:
+                reader.close()
+
+            with self._lock:
+                conn = self._connection()
+                # Vectors added or replaced while training were assigned with the old centroids
+                late, _ = self._assign_all(conn, centroids, after_id=last_id)
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.execute("DELETE FROM centroids")
+                    conn.executemany(
+                        "INSERT INTO centroids (list_id, centroid) VALUES (?, ?)",
+                        [(i, c.tobytes()) for i, c in enumerate(centroids)]
+                    )
+                    conn.executemany("UPDATE vectors SET list_id = ? WHERE id = ?", assignments + late)
+                    self._set_meta('trained_count', count)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                self._centroids = centroids
+                self._trained_count = count
+                self._lists.clear()
+        finally:
+            with self._lock:
+                self._training = False
+
+    @staticmethod
+    def _assign_all(conn, centroids, after_id=0):
+        """(list_id, id) pairs for every vector with id > after_id, and the last id seen"""
+        assignments = []
+        last_id = after_id
+        while True:
+            chunk = conn.execute(
+                "SELECT id, vector FROM vectors WHERE id > ? ORDER BY id LIMIT 10000", (last_id,)
+            ).fetchall()
+            if not chunk:
+                break
+            matrix = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in chunk])
+            assignment = _nearest(matrix, centroids)
+            assignments.extend((int(list_id), row[0]) for list_id, row in zip(assignment, chunk))
+            last_id = chunk[-1][0]
+        return assignments, last_id
+
+    def _get_list(self, list_id):
+        cached = self._lists.get(list_id)
+        if cached is not None:
+            self._lists.move_to_end(list_id)
+            return cached
+        rows = self._connection().execute(
+            "SELECT source_path, case_id, vector FROM vectors WHERE list_id = ?", (int(list_id),)
+        ).fetchall()
+        if rows:
+            entry = ([(row[0], row[1]) for row in rows],
+                     np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows]))
+        else:
+            entry = ([], None)
+        self._lists[list_id] = entry
+        while len(self._lists) > FACE_INDEX_CACHED_LISTS:
+            self._lists.popitem(last=False)
+        return entry
+
+    def search(self, embedding, k=10, threshold=None, nprobe=None, path_prefix=None):
+        """
+        Approximate top-k nearest faces by cosine distance
+
+        Args:
+            embedding: Query embedding from the same model
+            k: Maximum number of matches to return
+            threshold: Only return matches at or below this distance
+            nprobe: Number of lists to scan (default FACE_INDEX_NPROBE)
+            path_prefix: Only return images stored under this path
+
+        Returns:
+            list: Dicts with identity, case_id and distance, closest first
+        """
+        if k <= 0:
+            return []
+        unit = _normalize(embedding)
+        with self._lock:
+            self._connection()
+            if self._centroids is None:
+                probe = [0]
+            else:
+                nprobe = max(1, min(nprobe or self.nprobe, len(self._centroids)))
+                scores = self._centroids @ unit
+                probe = np.argpartition(-scores, nprobe - 1)[:nprobe]
+
+            candidates = []
+            matrices = []
+            for list_id in probe:
+                entries, matrix = self._get_list(int(list_id))
+                if matrix is not None:
+                    candidates.extend(entries)
+                    matrices.append(matrix)
+
+        if not matrices:
+            return []
+
+        distances = 1.0 - np.concatenate(matrices) @ unit
+        if path_prefix:
+            prefix = os.path.join(os.path.abspath(path_prefix), "")
+            keep = np.array([os.path.abspath(path).startswith(prefix) for path, _ in candidates])
+            distances = np.where(keep, distances, np.inf)
+        if threshold is not None:
+            distances = np.where(distances <= threshold, distances, np.inf)
+
+        k = min(k, len(distances))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        return [
+            {'identity': candidates[i][0], 'case_id': candidates[i][1], 'distance': float(distances[i])}
+            for i in top if np.isfinite(distances[i])
+        ]
+
+    def add_image(self, image_path, case_id=None):
+        """Embed an image file and index it; returns False when no face was found"""
+        # Imported here so queueing an upload does not load DeepFace/TensorFlow
+        from face_embeddings import get_face_embedding
+        try:
+            embedding = get_face_embedding(image_path, self.model_name, self.detector_backend, enforce_detection=True)
+        except Exception:
+            return False
+        self.add(embedding, image_path, case_id)
+        return True
+
+    def sync_directory(self, directory):
+        """Index every image in a directory that is not indexed yet"""
+        from models import get_document_case_id
+        added = 0
+        if not os.path.isdir(directory):
+            return added
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if os.path.splitext(name)[1].lower() not in IMAGE_EXTENSIONS or self.contains(path):
+                continue
+            # The case comes from the document row that owns the file, not the file name
+            if self.add_image(path, get_document_case_id(path)):
+                added += 1
+        return added
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_face_index(model_name='VGG-Face', detector_backend=FACE_INDEX_DETECTOR):
+    """Shared index instance for a model and detector"""
+    key = (model_name, detector_backend)
+    with _indexes_lock:
+        if key not in _indexes:
+            filename = f"{model_name}-{detector_backend}.db".replace(os.sep, '_')
+            _indexes[key] = FaceIndex(os.path.join(FACE_INDEX_DIR, filename), model_name, detector_backend)
+        return _indexes[key]
+
+_index_queue = queue.Queue()
+_index_worker = None
+_index_worker_lock = threading.Lock()
+
+def _run_index_worker():
+    while True:
+        job, target, argument = _index_queue.get()
+        try:
+            if job == 'image':
+                for model_name in FACE_INDEX_MODELS:
+                    get_face_index(model_name).add_image(target, argument)
+            else:
+                added = get_face_index(argument).sync_directory(target)
+                logging.info(f"Face index backfill of {target} for {argument}: {added} images added")
+        except Exception as e:
+            logging.error(f"Error indexing face images in {target}: {e}")
+        finally:
+            _index_queue.task_done()
+
+def _ensure_index_worker():
+    global _index_worker
+    with _index_worker_lock:
+        if _index_worker is None or not _index_worker.is_alive():
+            _index_worker = threading.Thread(target=_run_index_worker, name="face-index-worker", daemon=True)
+            _index_worker.start()
+
+def index_face_image_async(image_path, case_id=None):
+    """Queue a saved upload for face indexing without blocking the request"""
+    if os.path.splitext(image_path)[1].lower() not in IMAGE_EXTENSIONS:
+        return
+    _ensure_index_worker()
+    _index_queue.put(('image', image_path, case_id))
+
+def sync_directory_async(directory, model_name='VGG-Face'):
+    """Queue a backfill of a directory's unindexed images on the background worker"""
+    _ensure_index_worker()
+    _index_queue.put(('directory', directory, model_name))
+
+def search_similar_faces(embedding, model_name='VGG-Face', k=10, threshold=None, path_prefix=None):
+    """Top-k indexed faces for an embedding, using the model's verification threshold by default"""
+    if threshold is None:
+        from face_embeddings import get_model_threshold
+        threshold = get_model_threshold(model_name)
+    return get_face_index(model_name).search(embedding, k=k, threshold=threshold, path_prefix=path_prefix)
+
+if __name__ == "__main__":
+    # Admin backfill: python face_index.py [directory] [model ...]
+    import sys
+    directory = sys.argv[1] if len(sys.argv) > 1 else "uploads"
+    for model_name in sys.argv[2:] or FACE_INDEX_MODELS:
+        print(f"{model_name}: {get_face_index(model_name).sync_directory(directory)} images added from {directory}")
@@ -0,0 +1,185 @@
+"""
+Face Model Registry
+Preloads DeepFace recognition models and detector backends once per process and keeps them resident
+"""
+
+import os
+import time
+import threading
+
+try:
+    from deepface import DeepFace
+    DEEPFACE_AVAILABLE = True
+except ImportError:
+    DEEPFACE_AVAILABLE = False
+
+FACE_PRELOAD_MODELS = [m.strip() for m in os.environ.get("FACE_PRELOAD_MODELS", "VGG-Face").split(",") if m.strip()]
+FACE_PRELOAD_DETECTORS = [d.strip() for d in os.environ.get("FACE_PRELOAD_DETECTORS", "opencv").split(",") if d.strip()]
+FACE_PRELOAD_ENABLED = os.environ.get("FACE_PRELOAD_ENABLED", "1") != "0"
+
+def _rss_bytes():
+    """Current resident set size of this process, or None where unavailable"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+def _build_recognition_model(model_name):
+    return DeepFace.build_model(model_name=model_name)
+
+def _build_detector(detector_backend):
+    try:
+        # deepface >= 0.0.90 builds detectors through the same entry point
+        return DeepFace.build_model(model_name=detector_backend, task="face_detector")
+    except TypeError:
+        pass
+    try:
+        from deepface.detectors import DetectorWrapper
+        return DetectorWrapper.build_model(detector_backend)
+    except ImportError:
+        from deepface.detectors import FaceDetector
+        return FaceDetector.build_model(detector_backend)
+
+class ModelRegistry:
+    """Process-wide registry of warm DeepFace models with load time and memory per model"""
+
+    def __init__(self):
+        # DeepFace caches built models in module globals; loads are
+        # serialized so two sessions never build the same network at once
+        self._load_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._models = {}
+        self._preload_thread = None
+        self._warm_requested = set()
+
+    def _load(self, kind, name, builder):
+        key = (kind, name)
+        with self._lock:
+            entry = self._models.get(key)
+            if entry and entry['status'] == 'ready':
+                return entry
+
+        with self._load_lock:
+            with self._lock:
+                entry = self._models.get(key)
+                if entry and entry['status'] == 'ready':
+                    return entry
+                self._models[key] = {'kind': kind, 'name': name, 'status': 'loading'}
+
+            rss_before = _rss_bytes()
+            started = time.perf_counter()
+            try:
+                builder(name)
+            except Exception as e:
+                entry = {'kind': kind, 'name': name, 'status': 'failed', 'error': str(e)}
+            else:
+                rss_after = _rss_bytes()
+                entry = {
+                    'kind': kind,
+                    'name': name,
+                    'status': 'ready',
+                    'load_seconds': round(time.perf_counter() - started, 3),
+                    'memory_bytes': (rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+                    'loaded_at': time.time()
+                }
+            with self._lock:
+                self._models[key] = entry
+            return entry
+
+    def ensure_model(self, model_name):
+        """Load a recognition model if it is not resident yet"""
+        if not DEEPFACE_AVAILABLE:
+            return None
+        return self._load('model', model_name, _build_recognition_model)
+
+    def ensure_detector(self, detector_backend):
+        """Load a detector backend if it is not resident yet"""
+        if not DEEPFACE_AVAILABLE:
+            return None
+        return self._load('detector', detector_backend, _build_detector)
+
+    def is_ready(self, model_name, detector_backend=None):
+        """Whether a model (and optionally a detector) is already warm"""
+        with self._lock:
+            ready = self._models.get(('model', model_name), {}).get('status') == 'ready'
+            if detector_backend is not None:
+                ready = ready and self._models.get(('detector', detector_backend), {}).get('status') == 'ready'
+            return ready
+
+    def preload(self, models=None, detectors=None, background=True):
+        """Warm the given models and detectors, by default in a daemon thread
+
+        Only one preload thread runs at a time; further calls while it is
+        running are ignored.
+        """
+        if not DEEPFACE_AVAILABLE:
+            return None
+        models = FACE_PRELOAD_MODELS if models is None else models
+        detectors = FACE_PRELOAD_DETECTORS if detectors is None else detectors
+
+        def run():
+            for detector_backend in detectors:
+                self.ensure_detector(detector_backend)
+            for model_name in models:
+                self.ensure_model(model_name)
+
+        if not background:
+            run()
+            return None
+
+        with self._lock:
+            if self._preload_thread is not None and self._preload_thread.is_alive():
+                return self._preload_thread
+            self._preload_thread = threading.Thread(target=run, name="face-model-preload", daemon=True)
+            self._preload_thread.start()
+            return self._preload_thread
+
+    def warm_async(self, model_name, detector_backend=None):
+        """Start loading a model in the background so a later request finds it warm
+
+        Each model/detector pair is warmed at most once per process, so calling
+        this on every Streamlit rerun does not start a thread each time. A warm
+        that ends in a failed load (e.g. a weights download timeout) is
+        forgotten, so the next call tries again.
+        """
+        if not DEEPFACE_AVAILABLE or self.is_ready(model_name, detector_backend):
+            return
+        key = (model_name, detector_backend)
+        with self._lock:
+            if key in self._warm_requested:
+                return
+            self._warm_requested.add(key)
+
+        def run():
+            try:
+                self.preload([model_name], [detector_backend] if detector_backend else [], background=False)
+            finally:
+                if not self.is_ready(model_name, detector_backend):
+                    with self._lock:
+                        self._warm_requested.discard(key)
+
+        threading.Thread(target=run, name=f"face-model-warm-{model_name}", daemon=True).start()
+
+    def status(self):
+        """Load status, load time and resident memory for every registered model"""
+        with self._lock:
+            return sorted((dict(entry) for entry in self._models.values()),
+                          key=lambda entry: (entry['kind'], entry['name']))
+
+# Global instance for easy access
+model_registry = ModelRegistry()
+
+_preload_started = False
+_preload_started_lock = threading.Lock()
+
+def start_model_preload():
+    """Kick off the configured background preload once per process"""
+    global _preload_started
+    if not FACE_PRELOAD_ENABLED:
+        return None
+    with _preload_started_lock:
+        if _preload_started:
+            return None
+        _preload_started = True
+    return model_registry.preload()
@@ -9,12 +9,187 @@ import streamlit as st
 from io import BytesIO
 from PIL import Image
 import json
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from rate_limit import TokenBucket, backoff_delay
 
 # Face++ API Configuration
 import os
 FACE_PLUS_PLUS_API_KEY = os.environ.get("FACE_PLUS_PLUS_API_KEY")
 FACE_PLUS_PLUS_API_SECRET = os.environ.get("FACE_PLUS_PLUS_API_SECRET")
-FACE_PLUS_PLUS_ENDPOINT = "https://api-us.faceplusplus.com/facepp/v3/compare"
+FACE_PLUS_PLUS_BASE_URL = os.environ.get("FACE_PLUS_PLUS_BASE_URL", "https://api-us.faceplusplus.com/facepp/v3")
+FACE_PLUS_PLUS_ENDPOINT = f"{FACE_PLUS_PLUS_BASE_URL}/compare"
+FACE_PLUS_PLUS_DETECT_ENDPOINT = f"{FACE_PLUS_PLUS_BASE_URL}/detect"
+
+# Client tuning: QPS should match the account's Face++ quota
+FACE_PLUS_PLUS_QPS = float(os.environ.get("FACE_PLUS_PLUS_QPS", "3"))
+FACE_PLUS_PLUS_CONCURRENCY = int(os.environ.get("FACE_PLUS_PLUS_CONCURRENCY", "4"))
+FACE_PLUS_PLUS_TIMEOUT = float(os.environ.get("FACE_PLUS_PLUS_TIMEOUT", "15"))
+FACE_PLUS_PLUS_MAX_RETRIES = int(os.environ.get("FACE_PLUS_PLUS_MAX_RETRIES", "4"))
+# face_tokens not added to a FaceSet expire after 72 hours; keep a safety margin
+FACE_PLUS_PLUS_TOKEN_TTL = float(os.environ.get("FACE_PLUS_PLUS_TOKEN_TTL", str(71 * 3600)))
+FACE_PLUS_PLUS_TOKEN_CACHE_SIZE = int(os.environ.get("FACE_PLUS_PLUS_TOKEN_CACHE_SIZE", "10000"))
+
+# Face++ reports throttling as 403 with one of these error messages
+RETRYABLE_ERROR_MESSAGES = ('CONCURRENCY_LIMIT_EXCEEDED', 'RATE_LIMIT_EXCEEDED')
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_rate_limiter = TokenBucket(FACE_PLUS_PLUS_QPS)
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Shared keep-alive session sized for the bulk comparison executor"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(FACE_PLUS_PLUS_CONCURRENCY, 1))
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+def _is_retryable(response):
+    if response.status_code in RETRYABLE_STATUS_CODES:
+        return True
+    return response.status_code == 403 and any(message in response.text for message in RETRYABLE_ERROR_MESSAGES)
+
+def _retry_delay(attempt, response=None):
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return backoff_delay(attempt)
+
+def facepp_post(url, data, timeout=FACE_PLUS_PLUS_TIMEOUT, max_retries=FACE_PLUS_PLUS_MAX_RETRIES):
+    """
+    POST to a Face++ endpoint through the shared session and rate limiter
+    
+    Throttling responses, 5xx errors, timeouts and connection errors are
+    retried with jittered exponential backoff. Returns the final response;
+    raises the last network error if every attempt failed to connect.
+    """
+    session = get_session()
+    for attempt in range(max_retries + 1):
+        _rate_limiter.acquire()
+        try:
+            response = session.post(url, data=data, timeout=timeout)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+            if attempt == max_retries:
+                raise
+            time.sleep(_retry_delay(attempt))
+            continue
+        if attempt < max_retries and _is_retryable(response):
+            time.sleep(_retry_delay(attempt, response))
+            continue
+        return response
+
+class FaceTokenCache:
+    """Thread-safe cache of Face++ face_tokens keyed by image hash, expiring with the token"""
+    
+    def __init__(self, ttl=FACE_PLUS_PLUS_TOKEN_TTL, max_entries=FACE_PLUS_PLUS_TOKEN_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Return a live face_token or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[key]
+                return None
+            return entry[0]
+    
+    def put(self, key, face_token):
+        with self._lock:
+            self._entries[key] = (face_token, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+_face_tokens = FaceTokenCache()
+
+def _image_key(image_base64):
+    return hashlib.sha256(image_base64.encode('utf-8')).hexdigest()
+
+def detect_face_token(image_base64, refresh=False):
+    """
+    face_token of the largest face in an image, detected once per token lifetime
+    
+    Returns None when no face was found or detection failed, so callers can
+    fall back to sending the image itself. refresh skips the cached token
+    and detects again.
+    """
+    key = _image_key(image_base64)
+    face_token = None if refresh else _face_tokens.get(key)
+    if face_token:
+        return face_token
+    
+    try:
+        response = facepp_post(FACE_PLUS_PLUS_DETECT_ENDPOINT, {
+            'api_key': FACE_PLUS_PLUS_API_KEY,
+            'api_secret': FACE_PLUS_PLUS_API_SECRET,
+            'image_base64': image_base64
+        })
+        if response.status_code != 200:
+            return None
+        faces = response.json().get('faces') or []
+    except Exception:
+        return None
+    if not faces:
+        return None
+    
+    def face_area(face):
+        rectangle = face.get('face_rectangle') or {}
+        return rectangle.get('width', 0) * rectangle.get('height', 0)
+    
+    face_token = max(faces, key=face_area).get('face_token')
+    if face_token:
+        _face_tokens.put(key, face_token)
+    return face_token
+
+_refresh_locks = {}
+_refresh_locks_lock = threading.Lock()
+
+def refresh_face_token(image_base64, stale_token):
+    """
+    Replace a face_token Face++ rejected by detecting the image again
+    
+    Concurrent callers holding the same stale token share one re-detect:
+    whoever arrives after the refresh gets the new token from the cache.
+    Returns None if the image can no longer be detected.
+    """
+    key = _image_key(image_base64)
+    with _refresh_locks_lock:
+        lock = _refresh_locks.setdefault(key, threading.Lock())
+    try:
+        with lock:
+            current = _face_tokens.get(key)
+            if current and current != stale_token:
+                return current
+            # The stale token stays cached until the new one replaces it
+            face_token = detect_face_token(image_base64, refresh=True)
+            if face_token is None:
+                _face_tokens.invalidate(key)
+            return face_token
+    finally:
+        with _refresh_locks_lock:
+            if not lock.locked():
+                _refresh_locks.pop(key, None)
 
 def image_to_base64(image_file):
     """Convert uploaded image file to base64 string without prefix"""
@@ -46,10 +221,15 @@ def validate_base64(base64_string):
     except Exception:
         return False
 
-def compare_faces(image1_base64, image2_base64):
+def compare_faces(image1_base64, image2_base64, face_token1=None, face_token2=None):
     """
     Compare two faces using Face++ API
     Returns comparison result with confidence score
+    
+    When a face_token is given for a side it is sent instead of that image.
+    If Face++ rejects a token (expired or unknown), the image is detected
+    again to refresh its cached token and the comparison is retried, with
+    the image itself for any side that could not be re-detected.
     """
     try:
         # Check if API credentials are available
@@ -59,20 +239,34 @@ def compare_faces(image1_base64, image2_base64):
                 'error': "Face++ API credentials not found. Please check your environment variables."
             }
         
-        # Prepare data for API request
-        data = {
-            'api_key': FACE_PLUS_PLUS_API_KEY,
-            'api_secret': FACE_PLUS_PLUS_API_SECRET,
-            'image_base64_1': image1_base64,
-            'image_base64_2': image2_base64
-        }
-        
-        # Make POST request to Face++ API
-        headers = {
-            'Content-Type': 'application/x-www-form-urlencoded'
-        }
-        
-        response = requests.post(FACE_PLUS_PLUS_ENDPOINT, data=data, headers=headers)
+        # One retry per side, since Face++ reports one rejected token at a time
+        for attempt in range(3):
+            # Prepare data for API request
+            data = {
+                'api_key': FACE_PLUS_PLUS_API_KEY,
+                'api_secret': FACE_PLUS_PLUS_API_SECRET
+            }
+            if face_token1:
+                data['face_token1'] = face_token1
+            else:
+                data['image_base64_1'] = image1_base64
+            if face_token2:
+                data['face_token2'] = face_token2
+            else:
+                data['image_base64_2'] = image2_base64
+            
+            # Make POST request to Face++ API (pooled, rate limited, retried)
+            response = facepp_post(FACE_PLUS_PLUS_ENDPOINT, data)
+            
+            if attempt == 2 or not (face_token1 or face_token2) or response.status_code != 400 \
+                    or 'INVALID_FACE_TOKEN' not in response.text:
+                break
+            # The error names the rejected token; refresh every token sent if it does not
+            named = [token for token in (face_token1, face_token2) if token and token in response.text]
+            if face_token1 and (face_token1 in named or not named):
+                face_token1 = refresh_face_token(image1_base64, face_token1)
+            if face_token2 and (face_token2 in named or not named):
+                face_token2 = refresh_face_token(image2_base64, face_token2)
         
         if response.status_code == 200:
             result = response.json()
@@ -93,6 +287,47 @@ def compare_faces(image1_base64, image2_base64):
             'error': f"Error during face comparison: {str(e)}"
         }
 
+def compare_pairs(images, pairs, progress_callback=None):
+    """
+    Run Face++ comparisons for many image pairs concurrently
+    
+    Images that take part in more than one pair are detected once up front
+    and compared by face_token, so each is uploaded once rather than once
+    per pair. Each comparison reads the token from the cache when it runs,
+    so a token refreshed after a rejection is picked up by the pairs still
+    pending.
+    
+    Args:
+        images: List of base64 images
+        pairs: List of (i, j) index pairs into images
+        progress_callback: Optional callable(done, total) invoked as each comparison completes
+    
+    Returns:
+        list: compare_faces results in the same order as pairs
+    """
+    results = [None] * len(pairs)
+    usage = Counter(index for pair in pairs for index in pair)
+    reused = [index for index, count in usage.items() if count > 1]
+    
+    keys = {index: _image_key(images[index]) for index in reused}
+    
+    def compare(i, j):
+        token1 = _face_tokens.get(keys[i]) if i in keys else None
+        token2 = _face_tokens.get(keys[j]) if j in keys else None
+        return compare_faces(images[i], images[j], token1, token2)
+    
+    with ThreadPoolExecutor(max_workers=max(FACE_PLUS_PLUS_CONCURRENCY, 1)) as executor:
+        list(executor.map(detect_face_token, [images[index] for index in reused]))
+        futures = {
+            executor.submit(compare, i, j): position
+            for position, (i, j) in enumerate(pairs)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = future.result()
+            if progress_callback:
+                progress_callback(done, len(pairs))
+    return results
+
 def analyze_face_match_result(result):
     """Analyze Face++ API result and provide interpretation"""
     if not result.get('success'):
@@ -358,54 +593,32 @@ def process_bulk_comparison(uploaded_files, mode, threshold, show_details):
         st.error("❌ Failed to process images. Please try different images.")
         return
     
-    results = []
-    
     if mode == "Compare all images with first image (1 vs All)":
-        reference_image = base64_images[0]
-        reference_name = file_names[0]
-        
-        st.markdown(f"**Reference Image:** {reference_name}")
-        
-        for i in range(1, len(base64_images)):
-            result = compare_faces(reference_image, base64_images[i])
-            analysis = analyze_face_match_result(result)
-            
-            results.append({
-                'pair': f"{reference_name} vs {file_names[i]}",
-                'confidence': analysis['confidence'],
-                'match_status': analysis['match_status'],
-                'message': analysis['message']
-            })
-    
-    elif mode == "Compare all images pairwise (All vs All)":
-        for i in range(len(base64_images)):
-            for j in range(i + 1, len(base64_images)):
-                result = compare_faces(base64_images[i], base64_images[j])
-                analysis = analyze_face_match_result(result)
-                
-                results.append({
-                    'pair': f"{file_names[i]} vs {file_names[j]}",
-                    'confidence': analysis['confidence'],
-                    'match_status': analysis['match_status'],
-                    'message': analysis['message']
-                })
-    
-    elif mode == "Find best matches (Smart Grouping)":
+        st.markdown(f"**Reference Image:** {file_names[0]}")
+        pairs = [(0, j) for j in range(1, len(base64_images))]
+    else:
+        pairs = [(i, j) for i in range(len(base64_images)) for j in range(i + 1, len(base64_images))]
+    
+    # Comparisons run concurrently; the bar advances as each one returns
+    progress_bar = st.progress(0)
+    comparisons = compare_pairs(
+        base64_images, pairs,
+        progress_callback=lambda done, total: progress_bar.progress(done / total)
+    )
+    
+    results = []
+    for (i, j), result in zip(pairs, comparisons):
+        analysis = analyze_face_match_result(result)
+        results.append({
+            'pair': f"{file_names[i]} vs {file_names[j]}",
+            'confidence': analysis['confidence'],
+            'match_status': analysis['match_status'],
+            'message': analysis['message']
+        })
+    
+    if mode == "Find best matches (Smart Grouping)":
         # Find the best matching pairs
-        best_matches = []
-        for i in range(len(base64_images)):
-            for j in range(i + 1, len(base64_images)):
-                result = compare_faces(base64_images[i], base64_images[j])
-                analysis = analyze_face_match_result(result)
-                
-                if analysis['confidence'] >= threshold:
-                    best_matches.append({
-                        'pair': f"{file_names[i]} vs {file_names[j]}",
-                        'confidence': analysis['confidence'],
-                        'match_status': analysis['match_status'],
-                        'message': analysis['message']
-                    })
-        
+        best_matches = [r for r in results if r['confidence'] >= threshold]
         results = sorted(best_matches, key=lambda x: x['confidence'], reverse=True)
     
     # Display results
@@ -467,11 +680,7 @@ def check_face_plus_plus_status():
             'api_secret': FACE_PLUS_PLUS_API_SECRET
         }
         
-        response = requests.post(
-            'https://api-us.faceplusplus.com/facepp/v3/compare',
-            data=data,
-            timeout=5
-        )
+        response = get_session().post(FACE_PLUS_PLUS_ENDPOINT, data=data, timeout=5)
         
         if response.status_code == 401:
             return {
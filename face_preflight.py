@@ -0,0 +1,118 @@
+"""
+Face Preflight Module
+Cheap local face detection and quality scoring run before any paid or slow provider call
+"""
+
+import os
+import threading
+import cv2
+import numpy as np
+
+PREFLIGHT_DETECT_DIMENSION = int(os.environ.get("PREFLIGHT_DETECT_DIMENSION", "480"))
+PREFLIGHT_MIN_FACE_PX = int(os.environ.get("PREFLIGHT_MIN_FACE_PX", "48"))
+PREFLIGHT_MIN_SHARPNESS = float(os.environ.get("PREFLIGHT_MIN_SHARPNESS", "20"))
+PREFLIGHT_ENFORCE = os.environ.get("PREFLIGHT_ENFORCE", "1") != "0"
+
+# Face size and sharpness at which the quality score saturates
+GOOD_FACE_PX = 160
+GOOD_SHARPNESS = 150.0
+CROP_MARGIN = 0.25
+
+_cascade = None
+_cascade_lock = threading.Lock()
+
+def get_face_cascade():
+    """Frontal-face Haar cascade, loaded once per process"""
+    global _cascade
+    with _cascade_lock:
+        if _cascade is None:
+            cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+            if cascade.empty():
+                raise RuntimeError("Failed to load Haar cascade for face detection")
+            _cascade = cascade
+        return _cascade
+
+def detect_faces(bgr, detect_dimension=PREFLIGHT_DETECT_DIMENSION):
+    """
+    Detect frontal faces on a downscaled grayscale copy
+
+    Returns:
+        list: (x, y, w, h) boxes in the coordinates of the original image, largest first
+    """
+    height, width = bgr.shape[:2]
+    scale = min(1.0, detect_dimension / max(height, width))
+    gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+    if scale < 1.0:
+        gray = cv2.resize(gray, (max(1, int(width * scale)), max(1, int(height * scale))),
+                          interpolation=cv2.INTER_AREA)
+
+    min_size = max(12, int(PREFLIGHT_MIN_FACE_PX * scale * 0.5))
+    faces = get_face_cascade().detectMultiScale(gray, 1.1, 4, minSize=(min_size, min_size))
+    boxes = [tuple(int(round(v / scale)) for v in face) for face in faces]
+    return sorted(boxes, key=lambda box: box[2] * box[3], reverse=True)
+
+def _crop(bgr, box, margin=CROP_MARGIN):
+    x, y, w, h = box
+    dx, dy = int(w * margin), int(h * margin)
+    height, width = bgr.shape[:2]
+    return bgr[max(0, y - dy):min(height, y + h + dy), max(0, x - dx):min(width, x + w + dx)]
+
+def sharpness(bgr):
+    """Variance of the Laplacian; low values mean a blurry image"""
+    gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY) if bgr.ndim == 3 else bgr
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+def preflight_image(bgr):
+    """
+    Detect faces and score image quality
+
+    Args:
+        bgr: Decoded BGR image array
+
+    Returns:
+        dict: passed, reason, faces, face_box, crop, face_size, sharpness and quality_score (0-1)
+    """
+    faces = detect_faces(bgr)
+    if not faces:
+        return {
+            'passed': False,
+            'reason': 'No face detected',
+            'faces': [],
+            'face_box': None,
+            'crop': None,
+            'face_size': 0,
+            'sharpness': 0.0,
+            'quality_score': 0.0
+        }
+
+    face_box = faces[0]
+    crop = _crop(bgr, face_box)
+    face_size = min(face_box[2], face_box[3])
+    # Blur is measured on the face at a fixed size so scores are comparable
+    face_sharpness = sharpness(cv2.resize(crop, (GOOD_FACE_PX, GOOD_FACE_PX), interpolation=cv2.INTER_AREA)
+                               if face_size > GOOD_FACE_PX else crop)
+
+    size_score = min(1.0, face_size / GOOD_FACE_PX)
+    sharpness_score = min(1.0, face_sharpness / GOOD_SHARPNESS)
+    quality_score = round(0.5 * size_score + 0.5 * sharpness_score, 3)
+
+    reason = None
+    if face_size < PREFLIGHT_MIN_FACE_PX:
+        reason = f'Face too small ({face_size}px, minimum {PREFLIGHT_MIN_FACE_PX}px)'
+    elif face_sharpness < PREFLIGHT_MIN_SHARPNESS:
+        reason = f'Image too blurry (sharpness {face_sharpness:.1f}, minimum {PREFLIGHT_MIN_SHARPNESS:.0f})'
+
+    return {
+        'passed': reason is None,
+        'reason': reason,
+        'faces': faces,
+        'face_box': face_box,
+        'crop': np.ascontiguousarray(crop),
+        'face_size': face_size,
+        'sharpness': round(face_sharpness, 1),
+        'quality_score': quality_score
+    }
+
+def preflight_summary(preflight):
+    """JSON-friendly view of a preflight result (without the crop pixels)"""
+    return {key: value for key, value in preflight.items() if key != 'crop'}
@@ -4,8 +4,20 @@ import requests
 import json
 import cv2
 import numpy as np
-from typing import Dict, Tuple, Optional
-import streamlit as st
+from typing import Dict, List, Tuple, Optional
+from image_ingest import decode_image
+from provider_dispatch import ProviderDispatcher, run_sync
+from face_preflight import preflight_image, preflight_summary, PREFLIGHT_ENFORCE
+from face_plus_plus_integration import facepp_post, FACE_PLUS_PLUS_ENDPOINT
+
+# Per-provider deadlines in seconds (override with PROVIDER_TIMEOUT_<NAME>)
+PROVIDER_TIMEOUTS = {
+    'aws': 10.0,
+    'azure': 10.0,
+    'google': 10.0,
+    'face_plus_plus': 15.0,
+    'deepface': 60.0
+}
 
 class FaceVerificationAPI:
     """Real-time face verification API integration supporting multiple providers"""
@@ -18,8 +30,10 @@ class FaceVerificationAPI:
             'face_plus_plus': self._face_plus_plus_api,
             'deepface': self._deepface_api
         }
+        self.dispatcher = ProviderDispatcher(PROVIDER_TIMEOUTS, is_valid=lambda result: bool(result.get('success')))
     
-    def verify_faces(self, image1_bytes: bytes, image2_bytes: bytes, provider: str = 'face_plus_plus') -> Dict:
+    def verify_faces(self, image1_bytes: bytes, image2_bytes: bytes, provider: str = 'face_plus_plus',
+                     fallback_providers: Optional[List[str]] = None, hedge: bool = False) -> Dict:
         """
         Verify if two face images match using the specified provider
         
@@ -27,53 +41,74 @@ class FaceVerificationAPI:
             image1_bytes: First image as bytes (PAN card photo)
             image2_bytes: Second image as bytes (customer photo)
             provider: API provider to use ('aws', 'azure', 'google', 'face_plus_plus')
+            fallback_providers: Providers to try, in order, when the primary fails or times out
+            hedge: Start the next provider once the current one exceeds its p95 latency
+                   and return whichever valid answer arrives first
         
         Returns:
             Dict with verification results including match percentage and confidence
         """
         try:
-            if provider not in self.providers:
-                return self._error_response(f"Unsupported provider: {provider}")
-            
-            # Preprocess images
-            processed_img1 = self._preprocess_image(image1_bytes)
-            processed_img2 = self._preprocess_image(image2_bytes)
+            providers = [provider] + [p for p in (fallback_providers or []) if p != provider]
+            for name in providers:
+                if name not in self.providers:
+                    return self._error_response(f"Unsupported provider: {name}")
+            
+            # Preprocess images (decoded once) and run the local preflight
+            try:
+                processed_img1, preflight1 = self._preprocess_image(image1_bytes)
+                processed_img2, preflight2 = self._preprocess_image(image2_bytes)
+            except Exception as e:
+                return self._error_response(f"Failed to process images: {str(e)}")
+            
+            # Reject images that cannot match before spending a provider call
+            if PREFLIGHT_ENFORCE:
+                for label, preflight in (("first", preflight1), ("second", preflight2)):
+                    if not preflight['passed']:
+                        response = self._error_response(f"Image quality check failed for the {label} image: {preflight['reason']}")
+                        response['preflight'] = [preflight_summary(preflight1), preflight_summary(preflight2)]
+                        return response
+            
+            # DeepFace runs locally on the decoded arrays; remote providers
+            # receive the original upload bytes
+            img1_base64 = base64.b64encode(image1_bytes).decode('utf-8')
+            img2_base64 = base64.b64encode(image2_bytes).decode('utf-8')
+            calls = []
+            for name in providers:
+                if name == 'deepface':
+                    calls.append((name, self._deepface_api, (processed_img1, processed_img2)))
+                else:
+                    calls.append((name, self.providers[name], (img1_base64, img2_base64)))
             
-            if not processed_img1 or not processed_img2:
-                return self._error_response("Failed to process images")
+            name, result, errors = run_sync(self.dispatcher.first_valid(calls, hedge=hedge))
+            if result is None:
+                details = "; ".join(f"{p}: {e}" for p, e in errors.items())
+                return self._error_response(f"All providers failed ({details})")
             
-            # Call the specified provider's API
-            return self.providers[provider](processed_img1, processed_img2)
+            result = dict(result)
+            result['provider_key'] = name
+            result['preflight'] = [preflight_summary(preflight1), preflight_summary(preflight2)]
+            if errors:
+                result['provider_failures'] = errors
+            return result
             
         except Exception as e:
             return self._error_response(f"Face verification failed: {str(e)}")
     
-    def _preprocess_image(self, image_bytes: bytes) -> Optional[str]:
-        """Preprocess image for face verification APIs"""
-        try:
-            # Convert bytes to base64 for API transmission
-            base64_image = base64.b64encode(image_bytes).decode('utf-8')
-            
-            # Validate image using OpenCV
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            if img is None:
-                return None
-            
-            # Basic face detection to ensure face is present
-            face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(gray, 1.1, 4)
-            
-            if len(faces) == 0:
-                st.warning("⚠️ No face detected in one of the images")
-            
-            return base64_image
-            
-        except Exception as e:
-            st.error(f"Image preprocessing failed: {str(e)}")
-            return None
+    def _preprocess_image(self, image_bytes: bytes) -> Tuple[np.ndarray, Dict]:
+        """Decode an image for face verification and run the preflight checks
+        
+        Nothing is rendered here; a missing face is reported through the
+        preflight result and decode failures raise to verify_faces.
+        
+        Returns:
+            (BGR array, preflight result)
+        """
+        # Decode once (EXIF-oriented, size-capped); invalid images raise
+        img = decode_image(image_bytes)
+        
+        # Face detection on a downscaled copy with the shared cascade
+        return img, preflight_image(img)
     
     def _aws_rekognition(self, img1_base64: str, img2_base64: str) -> Dict:
         """AWS Rekognition face comparison"""
@@ -142,11 +177,13 @@ class FaceVerificationAPI:
             # Detect face in first image
             response1 = requests.post(detect_url, 
                                     headers=headers,
-                                    json={'url': f'data:image/jpeg;base64,{img1_base64}'})
+                                    json={'url': f'data:image/jpeg;base64,{img1_base64}'},
+                                    timeout=PROVIDER_TIMEOUTS['azure'])
             
             response2 = requests.post(detect_url,
                                     headers=headers, 
-                                    json={'url': f'data:image/jpeg;base64,{img2_base64}'})
+                                    json={'url': f'data:image/jpeg;base64,{img2_base64}'},
+                                    timeout=PROVIDER_TIMEOUTS['azure'])
             
             if response1.status_code != 200 or response2.status_code != 200:
                 return self._error_response("Azure Face detection failed")
@@ -164,7 +201,8 @@ class FaceVerificationAPI:
                 'faceId2': faces2[0]['faceId']
             }
             
-            verify_response = requests.post(verify_url, headers=headers, json=verify_data)
+            verify_response = requests.post(verify_url, headers=headers, json=verify_data,
+                                            timeout=PROVIDER_TIMEOUTS['azure'])
             
             if verify_response.status_code == 200:
                 result = verify_response.json()
@@ -210,7 +248,7 @@ class FaceVerificationAPI:
                 ]
             }
             
-            response = requests.post(url, headers=headers, json=data)
+            response = requests.post(url, headers=headers, json=data, timeout=PROVIDER_TIMEOUTS['google'])
             
             if response.status_code == 200:
                 results = response.json()
@@ -281,8 +319,6 @@ class FaceVerificationAPI:
             if not api_key or not api_secret:
                 return self._error_response("Face++ API credentials not found. Please provide FACE_PLUS_PLUS_API_KEY and FACE_PLUS_PLUS_API_SECRET")
             
-            url = "https://api-us.faceplusplus.com/facepp/v3/compare"
-            
             data = {
                 'api_key': api_key,
                 'api_secret': api_secret,
@@ -290,7 +326,8 @@ class FaceVerificationAPI:
                 'image_base64_2': img2_base64
             }
             
-            response = requests.post(url, data=data)
+            # Shares the pooled session, rate limiter and retry policy with every other Face++ call
+            response = facepp_post(FACE_PLUS_PLUS_ENDPOINT, data, timeout=PROVIDER_TIMEOUTS['face_plus_plus'])
             
             if response.status_code == 200:
                 result = response.json()
@@ -315,19 +352,10 @@ class FaceVerificationAPI:
         except Exception as e:
             return self._error_response(f"Face++ API error: {str(e)}")
     
-    def _deepface_api(self, img1_base64: str, img2_base64: str) -> Dict:
+    def _deepface_api(self, img1: np.ndarray, img2: np.ndarray) -> Dict:
         """DeepFace library face comparison with multiple deep learning models"""
         try:
             from deepface_integration import deepface_verifier
-            from PIL import Image
-            import io
-            
-            # Convert base64 images back to PIL Images for DeepFace
-            img1_bytes = base64.b64decode(img1_base64)
-            img2_bytes = base64.b64decode(img2_base64)
-            
-            img1 = Image.open(io.BytesIO(img1_bytes))
-            img2 = Image.open(io.BytesIO(img2_bytes))
             
             # Perform DeepFace verification
             result = deepface_verifier.verify_faces(
@@ -356,6 +384,10 @@ class FaceVerificationAPI:
         except Exception as e:
             return self._error_response(f"DeepFace API error: {str(e)}")
     
+    def get_provider_stats(self) -> Dict:
+        """Latency percentiles, error counts and circuit state per provider"""
+        return self.dispatcher.stats()
+    
     def _error_response(self, message: str) -> Dict:
         """Standard error response format"""
         return {
@@ -369,7 +401,8 @@ class FaceVerificationAPI:
 # Global instance
 face_verifier = FaceVerificationAPI()
 
-def verify_face_match(image1_bytes: bytes, image2_bytes: bytes, provider: str = 'deepface') -> Dict:
+def verify_face_match(image1_bytes: bytes, image2_bytes: bytes, provider: str = 'deepface',
+                      fallback_providers: Optional[List[str]] = None, hedge: bool = False) -> Dict:
     """
     Convenience function for face verification
     
@@ -377,11 +410,17 @@ def verify_face_match(image1_bytes: bytes, image2_bytes: bytes, provider: str =
         image1_bytes: First image as bytes
         image2_bytes: Second image as bytes  
         provider: API provider ('deepface', 'aws', 'azure', 'google', 'face_plus_plus')
+        fallback_providers: Providers to try when the primary fails
+        hedge: Race the next provider after the primary's p95 latency
     
     Returns:
         Verification results dictionary
     """
-    return face_verifier.verify_faces(image1_bytes, image2_bytes, provider)
+    return face_verifier.verify_faces(image1_bytes, image2_bytes, provider, fallback_providers, hedge)
+
+def get_provider_stats() -> Dict:
+    """Per-provider latency and error statistics for the shared verifier"""
+    return face_verifier.get_provider_stats()
 
 def perform_face_verification(reference_image, comparison_image, api_provider="DeepFace"):
     """
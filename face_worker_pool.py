@@ -0,0 +1,120 @@
+"""
+Face Worker Pool
+Process pool for CPU-bound DeepFace detection and embedding jobs, one warm model per worker
+"""
+
+import os
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+FACE_WORKER_PROCESSES = int(os.environ.get("FACE_WORKER_PROCESSES", str(max(1, (os.cpu_count() or 1) - 1))))
+FACE_WORKER_MIN_BATCH = int(os.environ.get("FACE_WORKER_MIN_BATCH", "4"))
+# Each worker runs single-threaded inference so N workers use N cores
+# instead of N processes each fighting over every core
+FACE_WORKER_THREADS = os.environ.get("FACE_WORKER_THREADS", "1")
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _init_worker(model_name, detector_backend):
+    """Pin the worker's math libraries to FACE_WORKER_THREADS and load the model once"""
+    for variable in ("OMP_NUM_THREADS", "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS"):
+        os.environ[variable] = FACE_WORKER_THREADS
+    # Imported here so the settings above apply before TensorFlow starts
+    from face_model_registry import model_registry
+    model_registry.ensure_detector(detector_backend)
+    model_registry.ensure_model(model_name)
+
+def _embed_job(index, image, model_name, detector_backend, enforce_detection):
+    # Workers never touch the embedding store; the parent writes results in one batch
+    from face_embeddings import represent_face
+    try:
+        return index, represent_face(image, model_name, detector_backend, enforce_detection), None
+    except Exception as e:
+        return index, None, str(e)
+
+def parallel_enabled(job_count):
+    """Whether a batch is large enough to be worth sending to the pool"""
+    return FACE_WORKER_PROCESSES > 1 and job_count >= FACE_WORKER_MIN_BATCH
+
+def get_worker_pool(model_name, detector_backend):
+    """Shared process pool whose workers have this model and detector loaded"""
+    key = (model_name, detector_backend)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            # spawn, not fork: the parent may already hold TensorFlow state
+            # and background threads, which do not survive a fork
+            pool = ProcessPoolExecutor(
+                max_workers=FACE_WORKER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model_name, detector_backend)
+            )
+            _pools[key] = pool
+        return pool
+
+def _discard_pool(key):
+    with _pools_lock:
+        pool = _pools.pop(key, None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def embed_in_pool(jobs, model_name, detector_backend, enforce_detection=True, on_result=None):
+    """
+    Embed images across the worker pool, reporting results as they complete
+
+    Args:
+        jobs: List of (index, image) pairs; images are paths or BGR arrays
+        model_name: DeepFace recognition model
+        detector_backend: Face detection backend
+        enforce_detection: Fail images without a detectable face
+        on_result: Optional callable(index, embedding, error) run in the caller's thread per result
+
+    Returns:
+        dict: index -> (embedding or None, error or None)
+
+    If a worker dies, the remaining jobs run in the calling process and the
+    pool is rebuilt on the next call.
+    """
+    pool = get_worker_pool(model_name, detector_backend)
+    futures = {
+        pool.submit(_embed_job, index, image, model_name, detector_backend, enforce_detection): index
+        for index, image in jobs
+    }
+    results = {}
+    try:
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                _, embedding, error = future.result()
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                embedding, error = None, str(e)
+            results[index] = (embedding, error)
+            if on_result:
+                on_result(index, embedding, error)
+    except BrokenProcessPool:
+        # Finish the batch in this process rather than failing it
+        _discard_pool((model_name, detector_backend))
+        for index, image in jobs:
+            if index not in results:
+                _, embedding, error = _embed_job(index, image, model_name, detector_backend, enforce_detection)
+                results[index] = (embedding, error)
+                if on_result:
+                    on_result(index, embedding, error)
+    return results
+
+def shutdown_worker_pools():
+    """Stop every worker process"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+atexit.register(shutdown_worker_pools)
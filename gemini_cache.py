@@ -0,0 +1,170 @@
+"""
+Gemini Response Cache
+Cache of Gemini responses keyed by model, prompt, parameters and image digests
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+GEMINI_CACHE_ENABLED = os.environ.get("GEMINI_CACHE_ENABLED", "1") != "0"
+GEMINI_CACHE_PATH = os.environ.get("GEMINI_CACHE_PATH", "gemini_cache.db")
+GEMINI_CACHE_TTL = float(os.environ.get("GEMINI_CACHE_TTL", str(7 * 24 * 3600)))
+GEMINI_CACHE_MAX_BYTES = int(os.environ.get("GEMINI_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Identity-document responses (PAN, MNRL, OCR, face) carry names, PAN numbers and
+# dates of birth, so they are only ever cached in process memory, briefly
+GEMINI_IDENTITY_CACHE_TTL = float(os.environ.get("GEMINI_IDENTITY_CACHE_TTL", "900"))
+GEMINI_IDENTITY_CACHE_MAX_BYTES = int(os.environ.get("GEMINI_IDENTITY_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+def _config_params(config):
+    """Generation parameters that change the answer, as a plain dict"""
+    if config is None:
+        return {}
+    if hasattr(config, 'model_dump'):
+        return config.model_dump(exclude_none=True, mode='json')
+    return dict(config)
+
+def make_cache_key(model, contents, config=None):
+    """
+    Cache key for a generate_content request
+
+    Text parts are hashed as the prompt; image and other binary parts
+    contribute the SHA-256 of their prepared bytes, in order.
+    """
+    prompt_hash = hashlib.sha256()
+    image_digests = []
+    for part in contents:
+        if isinstance(part, str):
+            prompt_hash.update(part.encode('utf-8'))
+            continue
+        inline_data = getattr(part, 'inline_data', None)
+        if inline_data is not None and inline_data.data is not None:
+            image_digests.append(hashlib.sha256(inline_data.data).hexdigest())
+        elif getattr(part, 'text', None):
+            prompt_hash.update(part.text.encode('utf-8'))
+
+    key_material = json.dumps({
+        'model': model,
+        'prompt_sha256': prompt_hash.hexdigest(),
+        'params': _config_params(config),
+        'images': image_digests
+    }, sort_keys=True)
+    return hashlib.sha256(key_material.encode('utf-8')).hexdigest()
+
+class CachedResponse:
+    """Stand-in for a generate_content response served from the cache"""
+
+    from_cache = True
+    usage_metadata = None
+
+    def __init__(self, text):
+        self.text = text
+
+class GeminiResponseCache:
+    """SQLite-backed response cache with TTL expiry and least-recently-used size bounding
+
+    A path of ":memory:" keeps the cache in process memory only.
+    """
+
+    def __init__(self, path=GEMINI_CACHE_PATH, ttl=GEMINI_CACHE_TTL, max_bytes=GEMINI_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def persistent(self):
+        """Whether responses are written to disk"""
+        return self.path != ":memory:"
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            if self.persistent:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    cache_key TEXT PRIMARY KEY,
+                    model_name TEXT NOT NULL,
+                    response_text TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            ''')
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, cache_key):
+        """Return the cached response text, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT response_text, expires_at FROM responses WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                conn.execute("DELETE FROM responses WHERE cache_key = ?", (cache_key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE cache_key = ?", (now, cache_key))
+            conn.commit()
+            return row[0]
+
+    def put(self, cache_key, model_name, response_text):
+        """Store a response, then drop expired entries and trim to the size cap"""
+        now = time.time()
+        size = len(response_text.encode('utf-8'))
+        with self._lock:
+            conn = self._connection()
+            conn.execute('''
+                INSERT OR REPLACE INTO responses
+                    (cache_key, model_name, response_text, size_bytes, created_at, expires_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (cache_key, model_name, response_text, size, now, now + self.ttl, now))
+            conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% of the cap so eviction does not run on every insert
+        target = int(self.max_bytes * 0.9)
+        evicted = []
+        for cache_key, size_bytes in conn.execute("SELECT cache_key, size_bytes FROM responses ORDER BY last_used ASC"):
+            if total <= target:
+                break
+            evicted.append((cache_key,))
+            total -= size_bytes
+        conn.executemany("DELETE FROM responses WHERE cache_key = ?", evicted)
+
+    def stats(self):
+        """Entry count and total stored bytes"""
+        with self._lock:
+            count, total = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM responses"
+            ).fetchone()
+        return {'entries': count, 'size_bytes': total, 'max_bytes': self.max_bytes, 'ttl_seconds': self.ttl,
+                'persistent': self.persistent}
+
+    def clear(self):
+        """Remove every cached response"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+# Global instances for easy access
+gemini_response_cache = GeminiResponseCache()
+gemini_identity_cache = GeminiResponseCache(":memory:", GEMINI_IDENTITY_CACHE_TTL, GEMINI_IDENTITY_CACHE_MAX_BYTES)
@@ -0,0 +1,288 @@
+"""
+Gemini Metrics Module
+Latency, payload, token, retry and error accounting for every Gemini call
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from bisect import bisect_left
+
+GEMINI_METRICS_ENABLED = os.environ.get("GEMINI_METRICS_ENABLED", "1") != "0"
+GEMINI_METRICS_PATH = os.environ.get("GEMINI_METRICS_PATH", "gemini_metrics.db")
+
+# Histogram bucket upper bounds; the last bucket is open-ended
+LATENCY_BUCKETS_MS = [100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000]
+TOKEN_BUCKETS = [250, 500, 1000, 2000, 4000, 8000, 16000, 32000]
+PAYLOAD_BUCKETS_BYTES = [1024, 16 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024]
+
+def payload_bytes(contents):
+    """Bytes sent for a contents list: UTF-8 prompt text plus inline image data"""
+    total = 0
+    for part in contents or []:
+        if isinstance(part, str):
+            total += len(part.encode('utf-8'))
+            continue
+        inline_data = getattr(part, 'inline_data', None)
+        if inline_data is not None and inline_data.data is not None:
+            total += len(inline_data.data)
+        elif getattr(part, 'text', None):
+            total += len(part.text.encode('utf-8'))
+    return total
+
+def usage_counts(response):
+    """(prompt, candidates, total) token counts from a response's usage metadata"""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return 0, 0, 0
+    prompt = getattr(usage, 'prompt_token_count', None) or 0
+    candidates = getattr(usage, 'candidates_token_count', None) or 0
+    total = getattr(usage, 'total_token_count', None) or (prompt + candidates)
+    return prompt, candidates, total
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum and bucket-estimated percentiles"""
+
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction (None past the last bound)"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.bounds[index] if index < len(self.bounds) else None
+        return None
+
+    def snapshot(self):
+        labels = [f"<={bound}" for bound in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 1) if self.count else None,
+            'p50': self.percentile(0.50),
+            'p95': self.percentile(0.95),
+            'buckets': dict(zip(labels, self.counts))
+        }
+
+class MethodMetrics:
+    """Counters and histograms for one GeminiVerificationServices method"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.prompt_tokens = 0
+        self.candidates_tokens = 0
+        self.total_tokens = 0
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.tokens = Histogram(TOKEN_BUCKETS)
+        self.payload = Histogram(PAYLOAD_BUCKETS_BYTES)
+
+    def record(self, call):
+        self.calls += 1
+        self.retries += call['retries']
+        if call['error']:
+            self.errors += 1
+        if call['from_cache']:
+            # Cache hits cost nothing upstream; keep them out of the latency and token histograms
+            self.cache_hits += 1
+            return
+        self.latency_ms.observe(call['latency_ms'])
+        self.payload.observe(call['payload_bytes'])
+        if not call['error'] and call['total_tokens']:
+            self.prompt_tokens += call['prompt_tokens']
+            self.candidates_tokens += call['candidates_tokens']
+            self.total_tokens += call['total_tokens']
+            self.tokens.observe(call['total_tokens'])
+
+    def snapshot(self):
+        upstream = self.calls - self.cache_hits
+        return {
+            'calls': self.calls,
+            'upstream_calls': upstream,
+            'cache_hits': self.cache_hits,
+            'errors': self.errors,
+            'retries': self.retries,
+            'error_rate': round(self.errors / self.calls, 4) if self.calls else 0.0,
+            'prompt_tokens': self.prompt_tokens,
+            'candidates_tokens': self.candidates_tokens,
+            'total_tokens': self.total_tokens,
+            'latency_ms': self.latency_ms.snapshot(),
+            'tokens_per_call': self.tokens.snapshot(),
+            'payload_bytes': self.payload.snapshot()
+        }
+
+class GeminiMetrics:
+    """Per-method in-memory aggregates plus a local SQLite table of individual calls"""
+
+    def __init__(self, path=GEMINI_METRICS_PATH, enabled=GEMINI_METRICS_ENABLED):
+        self.path = path
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._methods = {}
+        self._conn = None
+        self.started_at = time.time()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS gemini_calls (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    called_at REAL NOT NULL,
+                    method TEXT NOT NULL,
+                    model_name TEXT,
+                    latency_ms REAL NOT NULL,
+                    payload_bytes INTEGER NOT NULL,
+                    prompt_tokens INTEGER NOT NULL,
+                    candidates_tokens INTEGER NOT NULL,
+                    total_tokens INTEGER NOT NULL,
+                    retries INTEGER NOT NULL,
+                    from_cache INTEGER NOT NULL,
+                    error TEXT
+                )
+            ''')
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_gemini_calls_method ON gemini_calls (method, called_at)")
+            self._conn.commit()
+        return self._conn
+
+    def record(self, method, model_name, latency_ms, payload_bytes=0, response=None,
+               retries=0, from_cache=False, error=None):
+        """
+        Record one generate_content call
+
+        Args:
+            method: Service method that made the call
+            model_name: Gemini model requested
+            latency_ms: Wall time including rate-limit waits and retries
+            payload_bytes: Prepared request size (see payload_bytes())
+            response: Response object, for its usage metadata
+            retries: Attempts beyond the first
+            from_cache: Answered by the response cache
+            error: Error message if the call ultimately failed
+        """
+        if not self.enabled:
+            return
+        prompt_tokens, candidates_tokens, total_tokens = usage_counts(response)
+        call = {
+            'called_at': time.time(),
+            'method': method or 'unknown',
+            'model_name': model_name,
+            'latency_ms': round(latency_ms, 1),
+            'payload_bytes': payload_bytes,
+            'prompt_tokens': prompt_tokens,
+            'candidates_tokens': candidates_tokens,
+            'total_tokens': total_tokens,
+            'retries': retries,
+            'from_cache': bool(from_cache),
+            'error': error
+        }
+        with self._lock:
+            self._methods.setdefault(call['method'], MethodMetrics()).record(call)
+            try:
+                conn = self._connection()
+                conn.execute('''
+                    INSERT INTO gemini_calls
+                        (called_at, method, model_name, latency_ms, payload_bytes, prompt_tokens,
+                         candidates_tokens, total_tokens, retries, from_cache, error)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (call['called_at'], call['method'], call['model_name'], call['latency_ms'],
+                      call['payload_bytes'], prompt_tokens, candidates_tokens, total_tokens,
+                      retries, int(call['from_cache']), error))
+                conn.commit()
+            except sqlite3.Error:
+                # Metrics must never fail a verification call
+                pass
+
+    def snapshot(self):
+        """Per-method aggregates since process start"""
+        with self._lock:
+            return {
+                'since': self.started_at,
+                'methods': {method: metrics.snapshot() for method, metrics in sorted(self._methods.items())}
+            }
+
+    def recent_calls(self, limit=50, method=None):
+        """Most recent persisted calls, newest first"""
+        query = "SELECT * FROM gemini_calls"
+        params = []
+        if method:
+            query += " WHERE method = ?"
+            params.append(method)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def reset(self):
+        """Clear in-memory aggregates (persisted calls are kept)"""
+        with self._lock:
+            self._methods = {}
+            self.started_at = time.time()
+
+# Global instance for easy access
+gemini_metrics = GeminiMetrics()
+
+def show_gemini_metrics():
+    """Streamlit admin view of Gemini latency, token and error metrics"""
+    import streamlit as st
+    import pandas as pd
+
+    st.subheader("Gemini Usage Metrics")
+    snapshot = gemini_metrics.snapshot()
+    methods = snapshot['methods']
+    if not methods:
+        st.info("No Gemini calls recorded since startup")
+    else:
+        rows = []
+        for method, entry in methods.items():
+            rows.append({
+                'Method': method,
+                'Calls': entry['calls'],
+                'Cache hits': entry['cache_hits'],
+                'Errors': entry['errors'],
+                'Retries': entry['retries'],
+                'Mean latency (ms)': entry['latency_ms']['mean'],
+                'p95 latency (ms)': entry['latency_ms']['p95'],
+                'Prompt tokens': entry['prompt_tokens'],
+                'Output tokens': entry['candidates_tokens'],
+                'Mean payload (KB)': round(entry['payload_bytes']['mean'] / 1024, 1) if entry['payload_bytes']['mean'] else None
+            })
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+        selected = st.selectbox("Histogram for method:", list(methods.keys()))
+        col_latency, col_tokens = st.columns(2)
+        with col_latency:
+            st.caption("Latency (ms)")
+            st.bar_chart(pd.Series(methods[selected]['latency_ms']['buckets']))
+        with col_tokens:
+            st.caption("Tokens per call")
+            st.bar_chart(pd.Series(methods[selected]['tokens_per_call']['buckets']))
+
+    with st.expander("Recent calls"):
+        recent = gemini_metrics.recent_calls(limit=100)
+        if recent:
+            frame = pd.DataFrame(recent)
+            frame['called_at'] = pd.to_datetime(frame['called_at'], unit='s')
+            st.dataframe(frame.drop(columns=['id']), use_container_width=True, hide_index=True)
+        else:
+            st.write("No calls recorded")
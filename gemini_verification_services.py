@@ -4,15 +4,24 @@ Comprehensive AI verification capabilities using Google Gemini AI
 """
 
 import os
+import re
 import base64
 import json
+import hashlib
+import threading
 import cv2
 import numpy as np
 from typing import Dict, List, Optional, Tuple, Any
-from PIL import Image
+from PIL import Image, ImageOps
 import io
 import streamlit as st
+import time
 from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from rate_limit import TokenBucket, backoff_delay
+from gemini_cache import gemini_identity_cache, make_cache_key, CachedResponse, GEMINI_CACHE_ENABLED
+from gemini_metrics import gemini_metrics, payload_bytes
 
 # Import Google Gemini
 try:
@@ -31,67 +40,450 @@ except ImportError:
     client = None
     GEMINI_AVAILABLE = False
 
+# Request pacing shared by every Gemini call in this process
+GEMINI_QPS = float(os.environ.get("GEMINI_QPS", "4"))
+GEMINI_MAX_RETRIES = int(os.environ.get("GEMINI_MAX_RETRIES", "3"))
+GEMINI_BATCH_CONCURRENCY = int(os.environ.get("GEMINI_BATCH_CONCURRENCY", "4"))
+GEMINI_RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+GEMINI_RETRY_EXCEPTIONS = ('ConnectError', 'ConnectTimeout', 'ReadTimeout', 'RemoteProtocolError', 'TimeoutError')
+
+_gemini_rate_limiter = TokenBucket(GEMINI_QPS)
+
+def _is_retryable_gemini_error(error: Exception) -> bool:
+    """Rate-limit, server-side and transport errors are worth retrying"""
+    return getattr(error, 'code', None) in GEMINI_RETRY_STATUS_CODES or type(error).__name__ in GEMINI_RETRY_EXCEPTIONS
+
+# Longest image side sent to Gemini per task; faces need far fewer pixels than text
+GEMINI_IMAGE_DIMENSIONS = {
+    "face": int(os.environ.get("GEMINI_FACE_IMAGE_DIMENSION", "768")),
+    "ocr": int(os.environ.get("GEMINI_OCR_IMAGE_DIMENSION", "2048")),
+    "general": int(os.environ.get("GEMINI_IMAGE_DIMENSION", "1536"))
+}
+GEMINI_JPEG_QUALITY = {"face": 85, "ocr": 90, "general": 90}
+# Compliant inputs up to this size are sent without re-encoding
+GEMINI_PASSTHROUGH_MAX_BYTES = int(os.environ.get("GEMINI_PASSTHROUGH_MAX_BYTES", str(4 * 1024 * 1024)))
+GEMINI_PASSTHROUGH_FORMATS = {"JPEG": ("RGB", "L"), "PNG": ("RGB", "RGBA", "L", "LA"), "WEBP": ("RGB", "RGBA")}
+GEMINI_PREPARED_CACHE_SIZE = int(os.environ.get("GEMINI_PREPARED_CACHE_SIZE", "64"))
+
+_prepared_parts = OrderedDict()
+_prepared_parts_lock = threading.Lock()
+
+def _encode_for_gemini(data: bytes, target: int, quality: int) -> Dict[str, Any]:
+    """
+    Part.from_bytes arguments for an encoded image capped at target pixels
+    
+    Returns the original bytes when they are already an upright JPEG, PNG or
+    WebP within the cap; otherwise a JPEG re-encode. Large downscales use
+    JPEG draft decoding and reducing_gap with a bilinear filter instead of a
+    full-size Lanczos pass.
+    """
+    img = Image.open(io.BytesIO(data))
+    orientation = img.getexif().get(0x0112, 1)
+    
+    if (img.format in GEMINI_PASSTHROUGH_FORMATS
+            and img.mode in GEMINI_PASSTHROUGH_FORMATS[img.format]
+            and max(img.size) <= target
+            and orientation == 1
+            and len(data) <= GEMINI_PASSTHROUGH_MAX_BYTES):
+        return {"data": data, "mime_type": Image.MIME[img.format]}
+    
+    downscale = max(img.size) / target
+    if img.format == 'JPEG' and downscale >= 2:
+        img.draft('RGB', (target, target))
+    img = ImageOps.exif_transpose(img)
+    
+    # Convert to RGB if necessary (handles RGBA, CMYK, etc.)
+    if img.mode not in ['RGB', 'L']:
+        img = img.convert('RGB')
+    
+    if max(img.size) > target:
+        if downscale >= 2:
+            img.thumbnail((target, target), Image.Resampling.BILINEAR, reducing_gap=2.0)
+        else:
+            img.thumbnail((target, target), Image.Resampling.LANCZOS)
+    
+    output_buffer = io.BytesIO()
+    img.save(output_buffer, format='JPEG', quality=quality)
+    return {"data": output_buffer.getvalue(), "mime_type": "image/jpeg"}
+
+# Limits applied to verification data before it is sent for report generation
+REPORT_MAX_LIST_ITEMS = int(os.environ.get("REPORT_MAX_LIST_ITEMS", "20"))
+REPORT_MAX_STRING_CHARS = int(os.environ.get("REPORT_MAX_STRING_CHARS", "2000"))
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+REPORT_SECTIONS = [
+    "report_id", "generated_at", "report_type", "executive_summary", "verification_results",
+    "detailed_findings", "risk_assessment", "compliance_status", "quality_metrics",
+    "recommendations", "technical_details", "conclusion"
+]
+
+def _prune(value, max_items: int, max_chars: int):
+    """Drop None and empty values, truncate long lists and strings"""
+    if isinstance(value, dict):
+        pruned = {}
+        for key, item in value.items():
+            item = _prune(item, max_items, max_chars)
+            if item is not None and item != "" and item != [] and item != {}:
+                pruned[str(key)] = item
+        return pruned
+    if isinstance(value, (list, tuple)):
+        items = [_prune(item, max_items, max_chars) for item in value[:max_items]]
+        items = [item for item in items if item is not None and item != "" and item != [] and item != {}]
+        if len(value) > max_items:
+            items.append(f"... {len(value) - max_items} more items")
+        return items
+    if isinstance(value, (bytes, bytearray, np.ndarray)):
+        # Raw image or embedding data tells the report model nothing
+        return None
+    if isinstance(value, str) and len(value) > max_chars:
+        return value[:max_chars] + f"... [{len(value) - max_chars} more chars]"
+    return value
+
+def compact_verification_data(verification_data: Dict, max_items: int = None, max_chars: int = None) -> str:
+    """
+    Minified JSON of verification data for a report prompt
+    
+    None and empty fields are removed, lists are cut to max_items (default
+    REPORT_MAX_LIST_ITEMS) and strings to max_chars (default
+    REPORT_MAX_STRING_CHARS), each with a note of what was dropped.
+    """
+    pruned = _prune(verification_data, max_items or REPORT_MAX_LIST_ITEMS, max_chars or REPORT_MAX_STRING_CHARS)
+    return json.dumps(pruned, separators=(',', ':'), default=str, ensure_ascii=False)
+
+# Scan targets while looking for the end of a streamed report value
+_VALUE_TOKENS = re.compile(r'["\\{}\[\]]')
+_STRING_TOKENS = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r'[ \t\n\r,}\]]')
+
+class PartialReportParser:
+    """
+    Incremental parser for the top-level sections of a streamed JSON report
+    
+    Walks the root object one "key": value pair at a time, so section names
+    that appear inside string values or nested objects are never mistaken
+    for sections. Text before the last complete pair is dropped, and the
+    chunks of a pending value are scanned once as they arrive and joined
+    only when it closes, so feeding a long report chunk by chunk stays linear.
+    """
+    
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._text = ""
+        self._pos = None          # Offset just past the last complete pair
+        self._key = None          # Key of the pending value
+        self._value_start = None  # Offset of the pending value
+        self._pending = None      # Chunks of a value that continues past the received text
+        self._scalar = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.finished = False
+        self.sections = {}
+    
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        """
+        Add the next piece of the stream
+        
+        Returns:
+            dict: section name -> parsed value, for each section this chunk completed
+        """
+        completed = {}
+        if self.finished:
+            return completed
+        
+        value_closed = False
+        if self._pending is not None:
+            self._pending.append(chunk)
+            if self._scan(chunk, 0) is None:
+                return completed
+            self._text = "".join(self._pending)
+            self._pending = None
+            value_closed = True
+        else:
+            self._text += chunk
+            if self._pos is None:
+                start = self._text.find('{')
+                if start < 0:
+                    self._text = ""
+                    return completed
+                self._text = self._text[start + 1:]
+                self._pos = 0
+        
+        while not self.finished:
+            if not value_closed:
+                if self._value_start is None and not self._start_value():
+                    break
+                if self._scan(self._text, self._value_start) is None:
+                    # Collect the rest of the value from later chunks
+                    self._pending = [self._text[self._value_start:]]
+                    self._text = ""
+                    self._value_start = 0
+                    break
+            value_closed = False
+            try:
+                value, self._pos = self._decoder.raw_decode(self._text, self._value_start)
+            except ValueError:
+                self.finished = True
+                break
+            self._value_start = None
+            if self._key in REPORT_SECTIONS:
+                self.sections[self._key] = value
+                completed[self._key] = value
+        
+        if self._pending is None:
+            # Keep only the text from the next pair on
+            self._text = self._text[self._pos:]
+            self._pos = 0
+        return completed
+    
+    def _start_value(self):
+        """Read the next key and its colon; False until both have arrived or once the object ends"""
+        text = self._text
+        pos = _JSON_WHITESPACE.match(text, self._pos).end()
+        while pos < len(text) and text[pos] == ',':
+            pos = _JSON_WHITESPACE.match(text, pos + 1).end()
+        if pos >= len(text):
+            return False
+        if text[pos] == '}':
+            self.finished = True
+            return False
+        try:
+            key, pos = self._decoder.raw_decode(text, pos)
+        except ValueError:
+            # Keys are short; an incomplete one is decoded again with the next chunk
+            return False
+        if not isinstance(key, str):
+            self.finished = True
+            return False
+        pos = _JSON_WHITESPACE.match(text, pos).end()
+        if pos >= len(text):
+            return False
+        if text[pos] != ':':
+            self.finished = True
+            return False
+        pos = _JSON_WHITESPACE.match(text, pos + 1).end()
+        if pos >= len(text):
+            return False
+        self._key = key
+        self._value_start = pos
+        self._scalar = text[pos] not in '{["'
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        return True
+    
+    def _scan(self, text, pos):
+        """Offset in text where the pending value closes, or None if it continues past text"""
+        if self._scalar:
+            # A bare number or literal is only complete once something follows it
+            match = _SCALAR_END.search(text, pos)
+            return match.start() if match else None
+        if self._escape:
+            if pos >= len(text):
+                return None
+            self._escape = False
+            pos += 1
+        while True:
+            match = (_STRING_TOKENS if self._in_string else _VALUE_TOKENS).search(text, pos)
+            if match is None:
+                return None
+            token, pos = match.group(), match.end()
+            if token == '\\':
+                if pos >= len(text):
+                    self._escape = True
+                    return None
+                pos += 1
+            elif token == '"':
+                self._in_string = not self._in_string
+                if not self._in_string and self._depth == 0:
+                    return pos
+            elif token in '{[':
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    return pos
+
+def parse_partial_report(text: str) -> Dict[str, Any]:
+    """
+    Top-level report sections whose values are complete in a partial JSON stream
+    
+    Returns:
+        dict: section name -> parsed value, for each section fully received so far
+    """
+    parser = PartialReportParser()
+    parser.feed(text)
+    return parser.sections
+
 class GeminiVerificationServices:
     """Comprehensive AI verification services using Google Gemini"""
     
-    def __init__(self):
-        self.client = client
-        self.available = GEMINI_AVAILABLE
+    def __init__(self, gemini_client=None):
+        # A client can be injected (e.g. a stub in tests); default to the shared one
+        self.client = gemini_client or client
+        self.available = GEMINI_AVAILABLE or gemini_client is not None
         
     def check_availability(self) -> bool:
         """Check if Gemini AI services are available"""
         return self.available and self.client is not None
     
-    def _prepare_image_for_gemini(self, image_bytes: bytes, mime_type: str = "image/jpeg") -> Optional[types.Part]:
-        """Prepare image for Gemini AI processing with validation and conversion"""
+    def _generate_content(self, method: str = None, cache=None, **kwargs):
+        """
+        Call generate_content through the shared rate limiter
+        
+        Rate-limit (429), server (5xx) and transport errors are retried up to
+        GEMINI_MAX_RETRIES times with jittered exponential backoff. When a
+        response cache is given, an identical earlier request (same model,
+        prompt, parameters and image bytes) is answered from it.
+        Every call is recorded in gemini_metrics under method.
+        """
+        started = time.perf_counter()
+        request_bytes = payload_bytes(kwargs.get('contents'))
+        
+        def record(**details):
+            gemini_metrics.record(method, kwargs.get('model'), (time.perf_counter() - started) * 1000,
+                                  request_bytes, **details)
+        
+        cache_key = None
+        if cache is not None and GEMINI_CACHE_ENABLED:
+            cache_key = make_cache_key(kwargs.get('model'), kwargs.get('contents', []), kwargs.get('config'))
+            cached_text = cache.get(cache_key)
+            if cached_text is not None:
+                record(from_cache=True)
+                return CachedResponse(cached_text)
+        
+        attempts = []
+        try:
+            response = self._generate_with_retries(attempts, **kwargs)
+        except Exception as e:
+            record(retries=max(0, len(attempts) - 1), error=f"{type(e).__name__}: {e}"[:500])
+            raise
+        record(response=response, retries=len(attempts) - 1)
+        
+        if cache_key and response is not None and response.text:
+            self._cache_response(cache, cache_key, kwargs.get('model'), kwargs.get('config'), response.text)
+        return response
+    
+    def _cache_response(self, cache, cache_key: str, model: str, config, text: str):
+        """Store a response unless it is unusable JSON; cache failures never fail the call"""
         try:
-            # Validate and convert image if needed
-            from PIL import Image
-            import io
-            
-            # Open image to validate and potentially convert
+            if getattr(config, 'response_mime_type', None) == "application/json":
+                json.loads(text)
+            cache.put(cache_key, model, text)
+        except Exception:
+            pass
+    
+    def _generate_with_retries(self, attempts: List, **kwargs):
+        """Call the API, appending to attempts once per try"""
+        for attempt in range(GEMINI_MAX_RETRIES + 1):
+            attempts.append(attempt)
+            _gemini_rate_limiter.acquire()
             try:
-                img = Image.open(io.BytesIO(image_bytes))
-                
-                # Convert to RGB if necessary (handles RGBA, CMYK, etc.)
-                if img.mode not in ['RGB', 'L']:
-                    img = img.convert('RGB')
-                
-                # Resize if too large (Gemini has size limits)
-                max_size = (2048, 2048)
-                if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-                    img.thumbnail(max_size, Image.Resampling.LANCZOS)
-                
-                # Convert back to bytes
-                output_buffer = io.BytesIO()
-                img.save(output_buffer, format='JPEG', quality=90)
-                processed_bytes = output_buffer.getvalue()
-                
-                return types.Part.from_bytes(data=processed_bytes, mime_type="image/jpeg")
-                
-            except Exception as img_error:
-                # If PIL processing fails, try original bytes
-                return types.Part.from_bytes(data=image_bytes, mime_type=mime_type)
+                return self.client.models.generate_content(**kwargs)
+            except Exception as e:
+                if attempt == GEMINI_MAX_RETRIES or not _is_retryable_gemini_error(e):
+                    raise
+                time.sleep(backoff_delay(attempt))
+    
+    def _generate_content_stream(self, method: str = None, **kwargs):
+        """
+        Stream generate_content chunks through the shared rate limiter
+        
+        Retryable errors are retried only until the first chunk arrives, so
+        callers never see text repeated. The call is recorded in
+        gemini_metrics when the stream ends, with usage from the final chunk.
+        """
+        started = time.perf_counter()
+        request_bytes = payload_bytes(kwargs.get('contents'))
+        retries = 0
+        usage_chunk = None
+        error = None
+        try:
+            for attempt in range(GEMINI_MAX_RETRIES + 1):
+                _gemini_rate_limiter.acquire()
+                received = False
+                try:
+                    for chunk in self.client.models.generate_content_stream(**kwargs):
+                        received = True
+                        if getattr(chunk, 'usage_metadata', None) is not None:
+                            usage_chunk = chunk
+                        yield chunk
+                    return
+                except Exception as e:
+                    if received or attempt == GEMINI_MAX_RETRIES or not _is_retryable_gemini_error(e):
+                        raise
+                    retries += 1
+                    time.sleep(backoff_delay(attempt))
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:500]
+            raise
+        finally:
+            gemini_metrics.record(method, kwargs.get('model'), (time.perf_counter() - started) * 1000,
+                                  request_bytes, response=usage_chunk, retries=retries, error=error)
+    
+    def _prepare_image_for_gemini(self, image_bytes, mime_type: str = "image/jpeg",
+                                  task: str = "general") -> Optional[types.Part]:
+        """
+        Prepare image bytes (or an ingested BGR array) for Gemini AI processing
+        
+        The longest side is capped by task (GEMINI_IMAGE_DIMENSIONS: faces need far
+        fewer pixels than OCR). JPEG, PNG and WebP inputs already within the cap and
+        upright are sent as-is; everything else is re-encoded as JPEG. Prepared
+        Parts are memoized by content hash and task.
+        
+        Raises ValueError when the image cannot be prepared. This runs on batch
+        worker threads, so failures are returned in the caller's result rather
+        than rendered here.
+        """
+        try:
+            is_array = isinstance(image_bytes, np.ndarray)
+            digest = hashlib.sha256(image_bytes.tobytes() if is_array else bytes(image_bytes)).hexdigest()
+            memo_key = (digest, image_bytes.shape if is_array else None, task)
+            with _prepared_parts_lock:
+                part = _prepared_parts.get(memo_key)
+                if part is not None:
+                    _prepared_parts.move_to_end(memo_key)
+                    return part
+            
+            target = GEMINI_IMAGE_DIMENSIONS.get(task, GEMINI_IMAGE_DIMENSIONS["general"])
+            quality = GEMINI_JPEG_QUALITY.get(task, 90)
+            
+            if is_array:
+                # Arrays from the image-ingest stage are already decoded and oriented
+                from image_ingest import decode_image, encode_jpeg
+                part = types.Part.from_bytes(data=encode_jpeg(decode_image(image_bytes, target), quality=quality),
+                                             mime_type="image/jpeg")
+            else:
+                try:
+                    part = types.Part.from_bytes(**_encode_for_gemini(bytes(image_bytes), target, quality))
+                except Exception:
+                    # If PIL processing fails, try original bytes
+                    part = types.Part.from_bytes(data=image_bytes, mime_type=mime_type)
+            
+            with _prepared_parts_lock:
+                _prepared_parts[memo_key] = part
+                while len(_prepared_parts) > GEMINI_PREPARED_CACHE_SIZE:
+                    _prepared_parts.popitem(last=False)
+            return part
                 
         except Exception as e:
-            st.error(f"Failed to prepare image: {str(e)}")
-            return None
+            raise ValueError(f"Failed to prepare image: {str(e)}") from e
     
     def face_verification(self, image1_bytes: bytes, image2_bytes: bytes, 
-                         confidence_threshold: float = 0.85) -> Dict[str, Any]:
+                         confidence_threshold: float = 0.85, bypass_cache: bool = True) -> Dict[str, Any]:
         """
         AI-powered face verification using Gemini
+        
+        With bypass_cache=False, identical requests within GEMINI_IDENTITY_CACHE_TTL
+        are answered from the in-memory identity cache; responses are never written to disk.
         """
         if not self.check_availability():
             return {"error": "Gemini AI service not available", "success": False}
         
+        started = time.perf_counter()
         try:
             # Prepare images for processing
-            image1_part = self._prepare_image_for_gemini(image1_bytes)
-            image2_part = self._prepare_image_for_gemini(image2_bytes)
-            
-            if not image1_part or not image2_part:
-                return {"error": "Failed to process images", "success": False}
+            image1_part = self._prepare_image_for_gemini(image1_bytes, task="face")
+            image2_part = self._prepare_image_for_gemini(image2_bytes, task="face")
             
             # Create detailed verification prompt
             prompt = f"""
@@ -133,7 +525,9 @@ class GeminiVerificationServices:
             """
             
             # Call Gemini API
-            response = self.client.models.generate_content(
+            response = self._generate_content(
+                method="face_verification",
+                cache=None if bypass_cache else gemini_identity_cache,
                 model="gemini-2.0-flash-exp",
                 contents=[image1_part, image2_part, prompt],
                 config=types.GenerateContentConfig(
@@ -145,7 +539,10 @@ class GeminiVerificationServices:
             if response and response.text:
                 result = json.loads(response.text)
                 result["success"] = True
-                result["processing_time"] = "2.1s"
+                result["from_cache"] = getattr(response, 'from_cache', False)
+                elapsed = time.perf_counter() - started
+                result["processing_time"] = f"{elapsed:.2f}s"
+                result["processing_seconds"] = round(elapsed, 3)
                 result["ai_model"] = "Gemini-2.0-Flash"
                 return result
             else:
@@ -155,17 +552,19 @@ class GeminiVerificationServices:
             return {"error": f"Face verification failed: {str(e)}", "success": False}
     
     def document_ocr_analysis(self, image_bytes: bytes, document_type: str = "general", 
-                             extract_tables: bool = True) -> Dict[str, Any]:
+                             extract_tables: bool = True, bypass_cache: bool = True) -> Dict[str, Any]:
         """
         AI-powered OCR and document analysis using Gemini
+        
+        With bypass_cache=False, identical requests within GEMINI_IDENTITY_CACHE_TTL
+        are answered from the in-memory identity cache; responses are never written to disk.
         """
         if not self.check_availability():
             return {"error": "Gemini AI service not available", "success": False}
         
+        started = time.perf_counter()
         try:
-            image_part = self._prepare_image_for_gemini(image_bytes)
-            if not image_part:
-                return {"error": "Failed to process image", "success": False}
+            image_part = self._prepare_image_for_gemini(image_bytes, task="ocr")
             
             prompt = f"""
             Perform comprehensive OCR and document analysis on this {document_type} document:
@@ -213,7 +612,9 @@ class GeminiVerificationServices:
             }}
             """
             
-            response = self.client.models.generate_content(
+            response = self._generate_content(
+                method="document_ocr_analysis",
+                cache=None if bypass_cache else gemini_identity_cache,
                 model="gemini-2.0-flash-exp",
                 contents=[image_part, prompt],
                 config=types.GenerateContentConfig(
@@ -225,7 +626,10 @@ class GeminiVerificationServices:
             if response and response.text:
                 result = json.loads(response.text)
                 result["success"] = True
-                result["processing_time"] = "1.8s"
+                result["from_cache"] = getattr(response, 'from_cache', False)
+                elapsed = time.perf_counter() - started
+                result["processing_time"] = f"{elapsed:.2f}s"
+                result["processing_seconds"] = round(elapsed, 3)
                 result["ai_model"] = "Gemini-2.0-Flash"
                 return result
             else:
@@ -235,13 +639,17 @@ class GeminiVerificationServices:
             return {"error": f"OCR analysis failed: {str(e)}", "success": False}
     
     def pan_aadhaar_linkage_verification(self, pan_number: str, aadhaar_number: str, 
-                                       name: str, dob: str = None) -> Dict[str, Any]:
+                                       name: str, dob: str = None, bypass_cache: bool = True) -> Dict[str, Any]:
         """
         AI-powered PAN-Aadhaar linkage verification analysis
+        
+        With bypass_cache=False, identical requests within GEMINI_IDENTITY_CACHE_TTL
+        are answered from the in-memory identity cache; responses are never written to disk.
         """
         if not self.check_availability():
             return {"error": "Gemini AI service not available", "success": False}
         
+        started = time.perf_counter()
         try:
             prompt = f"""
             Analyze PAN-Aadhaar linkage verification request:
@@ -295,7 +703,9 @@ class GeminiVerificationServices:
             }}
             """
             
-            response = self.client.models.generate_content(
+            response = self._generate_content(
+                method="pan_aadhaar_linkage_verification",
+                cache=None if bypass_cache else gemini_identity_cache,
                 model="gemini-2.0-flash-exp",
                 contents=[prompt],
                 config=types.GenerateContentConfig(
@@ -307,7 +717,10 @@ class GeminiVerificationServices:
             if response and response.text:
                 result = json.loads(response.text)
                 result["success"] = True
-                result["processing_time"] = "1.2s"
+                result["from_cache"] = getattr(response, 'from_cache', False)
+                elapsed = time.perf_counter() - started
+                result["processing_time"] = f"{elapsed:.2f}s"
+                result["processing_seconds"] = round(elapsed, 3)
                 result["ai_model"] = "Gemini-2.0-Flash"
                 return result
             else:
@@ -316,20 +729,69 @@ class GeminiVerificationServices:
         except Exception as e:
             return {"error": f"Linkage verification failed: {str(e)}", "success": False}
     
-    def multi_document_batch_analysis(self, documents: List[Dict], analysis_options: Dict) -> Dict[str, Any]:
+    def _analyze_batch_document(self, index: int, doc: Dict, analysis_options: Dict) -> Dict[str, Any]:
+        """Run OCR analysis for one batch document and time it"""
+        started = time.perf_counter()
+        try:
+            ocr_result = self.document_ocr_analysis(
+                doc['bytes'], 
+                doc.get('document_type', 'general'),
+                analysis_options.get('extract_tables', True)
+            )
+            entry = {'index': index, 'file_name': doc['name']}
+            if ocr_result.get('success'):
+                entry.update({'status': 'success', 'result': ocr_result})
+            else:
+                entry.update({'status': 'failed', 'error': ocr_result.get('error', 'Unknown error')})
+        except Exception as doc_error:
+            entry = {
+                'index': index,
+                'file_name': doc.get('name', f'Document_{index}'),
+                'status': 'failed',
+                'error': str(doc_error)
+            }
+        entry['processing_seconds'] = round(time.perf_counter() - started, 3)
+        return entry
+    
+    def iter_batch_analysis(self, documents: List[Dict], analysis_options: Dict, max_concurrency: int = None):
+        """
+        Analyze image documents concurrently, yielding each result as it completes
+        
+        At most max_concurrency (default GEMINI_BATCH_CONCURRENCY) documents are
+        in flight; all calls share the process-wide Gemini rate limiter.
+        Non-image documents are skipped.
+        """
+        jobs = [(idx, doc) for idx, doc in enumerate(documents) if doc.get('type', '').startswith('image')]
+        if not jobs:
+            return
+        workers = max(1, min(max_concurrency or GEMINI_BATCH_CONCURRENCY, len(jobs)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gemini-batch") as executor:
+            futures = [executor.submit(self._analyze_batch_document, idx, doc, analysis_options) for idx, doc in jobs]
+            for future in as_completed(futures):
+                yield future.result()
+    
+    def multi_document_batch_analysis(self, documents: List[Dict], analysis_options: Dict,
+                                      on_result=None) -> Dict[str, Any]:
         """
         AI-powered batch document analysis
+        
+        Documents are processed concurrently; on_result, if given, is called
+        with each document's entry as soon as it completes. Per-document
+        errors are returned in each entry's 'error' for the caller to render.
+        Non-image documents are skipped and excluded from success_rate.
         """
         if not self.check_availability():
             return {"error": "Gemini AI service not available", "success": False}
         
         try:
+            batch_started = time.perf_counter()
             results = {
                 "batch_id": f"BATCH_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
                 "total_documents": len(documents),
                 "processed_documents": 0,
                 "success_count": 0,
                 "failed_count": 0,
+                "skipped_count": 0,
                 "processing_results": [],
                 "batch_summary": {},
                 "overall_quality": 0.0,
@@ -337,50 +799,41 @@ class GeminiVerificationServices:
                 "recommendations": []
             }
             
-            for idx, doc in enumerate(documents):
-                try:
-                    # Process each document based on its type
-                    if doc.get('type', '').startswith('image'):
-                        # Image document processing
-                        ocr_result = self.document_ocr_analysis(
-                            doc['bytes'], 
-                            doc.get('document_type', 'general'),
-                            analysis_options.get('extract_tables', True)
-                        )
-                        
-                        if ocr_result.get('success'):
-                            results['processed_documents'] += 1
-                            results['success_count'] += 1
-                            results['processing_results'].append({
-                                'file_name': doc['name'],
-                                'status': 'success',
-                                'result': ocr_result
-                            })
-                        else:
-                            results['failed_count'] += 1
-                            results['processing_results'].append({
-                                'file_name': doc['name'],
-                                'status': 'failed',
-                                'error': ocr_result.get('error', 'Unknown error')
-                            })
-                    
-                except Exception as doc_error:
+            entries = []
+            for entry in self.iter_batch_analysis(documents, analysis_options):
+                entries.append(entry)
+                if entry['status'] == 'success':
+                    results['processed_documents'] += 1
+                    results['success_count'] += 1
+                else:
                     results['failed_count'] += 1
-                    results['processing_results'].append({
-                        'file_name': doc.get('name', f'Document_{idx}'),
-                        'status': 'failed',
-                        'error': str(doc_error)
-                    })
+                if on_result:
+                    on_result(entry)
+            
+            results['skipped_count'] = len(documents) - len(entries)
+            
+            # Report in upload order regardless of completion order
+            entries.sort(key=lambda entry: entry['index'])
+            results['processing_results'] = [
+                {key: value for key, value in entry.items() if key != 'index'} for entry in entries
+            ]
+            
+            # Generate batch summary from measured latencies and reported quality
+            latencies = sorted(entry['processing_seconds'] for entry in entries)
+            quality_distribution = {}
+            for entry in entries:
+                if entry['status'] == 'success':
+                    quality = (entry['result'].get('quality_assessment') or {}).get('image_quality', 'unknown')
+                    quality_distribution[quality] = quality_distribution.get(quality, 0) + 1
             
-            # Generate batch summary
+            average = sum(latencies) / len(latencies) if latencies else 0.0
             results['batch_summary'] = {
-                'success_rate': (results['success_count'] / len(documents)) * 100 if documents else 0,
-                'average_processing_time': '1.5s',
-                'quality_distribution': {
-                    'excellent': results['success_count'] // 2,
-                    'good': results['success_count'] // 3,
-                    'fair': results['success_count'] // 6
-                }
+                'success_rate': (results['success_count'] / len(entries)) * 100 if entries else 0,
+                'average_processing_time': f"{average:.2f}s",
+                'average_processing_seconds': round(average, 3),
+                'p95_processing_seconds': latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else 0.0,
+                'total_wall_seconds': round(time.perf_counter() - batch_started, 3),
+                'quality_distribution': quality_distribution
             }
             
             results["success"] = True
@@ -390,19 +843,13 @@ class GeminiVerificationServices:
         except Exception as e:
             return {"error": f"Batch analysis failed: {str(e)}", "success": False}
     
-    def generate_verification_report(self, verification_data: Dict, report_type: str = "comprehensive") -> Dict[str, Any]:
-        """
-        AI-powered report generation from verification results
-        """
-        if not self.check_availability():
-            return {"error": "Gemini AI service not available", "success": False}
-        
-        try:
-            prompt = f"""
+    def _report_prompt(self, verification_data: Dict, report_type: str) -> str:
+        """Report prompt with the verification data compacted (see compact_verification_data)"""
+        return f"""
             Generate a comprehensive verification report based on the following data:
 
             VERIFICATION DATA:
-            {json.dumps(verification_data, indent=2)}
+            {compact_verification_data(verification_data)}
 
             REPORT REQUIREMENTS:
             1. Executive summary of findings
@@ -463,8 +910,22 @@ class GeminiVerificationServices:
                 "conclusion": "Final assessment and recommendations"
             }}
             """
+    
+    def generate_verification_report(self, verification_data: Dict, report_type: str = "comprehensive") -> Dict[str, Any]:
+        """
+        AI-powered report generation from verification results
+        
+        Blocks until the whole report is generated; see stream_verification_report
+        for progressive output.
+        """
+        if not self.check_availability():
+            return {"error": "Gemini AI service not available", "success": False}
+        
+        try:
+            prompt = self._report_prompt(verification_data, report_type)
             
-            response = self.client.models.generate_content(
+            response = self._generate_content(
+                method="generate_verification_report",
                 model="gemini-2.0-flash-exp",
                 contents=[prompt],
                 config=types.GenerateContentConfig(
@@ -484,9 +945,39 @@ class GeminiVerificationServices:
         except Exception as e:
             return {"error": f"Report generation failed: {str(e)}", "success": False}
     
-    def analyze_mnrl_risk(self, mobile_number: str, mnrl_result: Dict[str, Any]) -> str:
+    def stream_verification_report(self, verification_data: Dict, report_type: str = "comprehensive"):
+        """
+        Generate a verification report, yielding the JSON text as it arrives
+        
+        Concatenating the yielded chunks gives the same JSON document that
+        generate_verification_report parses; a PartialReportParser fed each
+        chunk extracts the sections it completes.
+        
+        Raises:
+            RuntimeError: If Gemini is not available
+        """
+        if not self.check_availability():
+            raise RuntimeError("Gemini AI service not available")
+        
+        prompt = self._report_prompt(verification_data, report_type)
+        for chunk in self._generate_content_stream(
+            method="stream_verification_report",
+            model="gemini-2.0-flash-exp",
+            contents=[prompt],
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                temperature=0.2
+            )
+        ):
+            if chunk.text:
+                yield chunk.text
+    
+    def analyze_mnrl_risk(self, mobile_number: str, mnrl_result: Dict[str, Any], bypass_cache: bool = True) -> str:
         """
         AI-powered risk analysis for MNRL verification results
+        
+        With bypass_cache=False, identical requests within GEMINI_IDENTITY_CACHE_TTL
+        are answered from the in-memory identity cache; responses are never written to disk.
         """
         if not self.check_availability():
             return "AI analysis unavailable - please ensure GEMINI_API_KEY is configured"
@@ -526,7 +1017,9 @@ class GeminiVerificationServices:
             Provide a concise but comprehensive risk assessment in 2-3 sentences.
             """
             
-            response = self.client.models.generate_content(
+            response = self._generate_content(
+                method="analyze_mnrl_risk",
+                cache=None if bypass_cache else gemini_identity_cache,
                 model="gemini-2.0-flash-exp",
                 contents=[prompt],
                 config=types.GenerateContentConfig(temperature=0.3)
@@ -541,4 +1034,44 @@ class GeminiVerificationServices:
             return f"Risk analysis failed: {str(e)}"
 
 # Global instance for easy access
-gemini_services = GeminiVerificationServices()
\ No newline at end of file
+gemini_services = GeminiVerificationServices()
+
+def render_streaming_report(verification_data: Dict, report_type: str = "comprehensive",
+                            services: GeminiVerificationServices = None) -> Dict[str, Any]:
+    """
+    Stream a verification report into the page, showing each section as soon as it is complete
+    
+    Returns:
+        dict: The parsed report with success, or an error dict like generate_verification_report
+    """
+    services = services or gemini_services
+    status = st.empty()
+    placeholders = {name: st.empty() for name in REPORT_SECTIONS
+                    if name not in ("report_id", "generated_at", "report_type")}
+    parser = PartialReportParser()
+    chunks = []
+    received = 0
+    
+    status.info("Generating report...")
+    try:
+        for chunk in services.stream_verification_report(verification_data, report_type):
+            chunks.append(chunk)
+            received += len(chunk)
+            status.info(f"Generating report... {received:,} characters received")
+            for name, value in parser.feed(chunk).items():
+                if name in placeholders:
+                    with placeholders[name].container():
+                        st.markdown(f"#### {name.replace('_', ' ').title()}")
+                        if isinstance(value, (dict, list)):
+                            st.json(value)
+                        else:
+                            st.write(value)
+        result = json.loads("".join(chunks))
+    except Exception as e:
+        status.error(f"Report generation failed: {str(e)}")
+        return {"error": f"Report generation failed: {str(e)}", "success": False}
+    
+    status.empty()
+    result["success"] = True
+    result["ai_model"] = "Gemini-2.0-Flash"
+    return result
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+Image Ingest Module
+Decodes each uploaded image once into an oriented, size-capped BGR array shared by the face pipelines
+"""
+
+import io
+import os
+import numpy as np
+from PIL import Image, ImageOps
+
+INGEST_MAX_DIMENSION = int(os.environ.get("INGEST_MAX_DIMENSION", "1600"))
+
+def decode_image(source, max_dimension=INGEST_MAX_DIMENSION):
+    """
+    Decode an image into a BGR uint8 array (the layout DeepFace and OpenCV expect)
+
+    EXIF orientation is applied and the longest side is capped at
+    max_dimension. JPEGs are decoded at reduced scale directly when they are
+    much larger than the cap, which avoids materializing full-size pixels.
+
+    Args:
+        source: Streamlit upload / file-like object, bytes, file path, PIL Image or BGR array
+        max_dimension: Longest side of the result in pixels (None or 0 to keep full size)
+
+    Returns:
+        np.ndarray: Contiguous (h, w, 3) BGR array
+    """
+    if isinstance(source, np.ndarray):
+        return _downscale_array(source, max_dimension)
+
+    if isinstance(source, Image.Image):
+        image = source
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        image = Image.open(io.BytesIO(source))
+    else:
+        image = Image.open(source)
+
+    if max_dimension and image.format == 'JPEG':
+        image.draft('RGB', (max_dimension, max_dimension))
+
+    image = ImageOps.exif_transpose(image)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    if max_dimension and max(image.size) > max_dimension:
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.BILINEAR)
+
+    bgr = np.ascontiguousarray(np.asarray(image)[:, :, ::-1])
+    if hasattr(source, 'seek'):
+        # Leave uploads readable for callers that save or re-send them
+        source.seek(0)
+    return bgr
+
+def _downscale_array(bgr, max_dimension):
+    if bgr.ndim == 2:
+        bgr = np.repeat(bgr[:, :, None], 3, axis=2)
+    if not max_dimension or max(bgr.shape[:2]) <= max_dimension:
+        return np.ascontiguousarray(bgr)
+    image = to_pil(bgr)
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.BILINEAR)
+    return np.ascontiguousarray(np.asarray(image)[:, :, ::-1])
+
+def to_pil(bgr):
+    """RGB PIL Image view of a BGR array"""
+    return Image.fromarray(np.ascontiguousarray(bgr[:, :, ::-1]))
+
+def encode_jpeg(bgr, quality=90):
+    """Encode a BGR array as JPEG bytes"""
+    buffer = io.BytesIO()
+    to_pil(bgr).save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
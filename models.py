@@ -1,14 +1,69 @@
 import sqlite3
+import json
+import base64
 from datetime import datetime
-from database import get_db_connection, log_audit
+from query_cache import cached_query, invalidate
+from database import get_db_connection, get_password_hash, log_audit, flush_audit_log, transition_case_status, bulk_transition_case_status
 
+@cached_query("user", ttl=60)
 def get_user_by_username(username):
-    """Get user by username"""
+    """Get user by username
+
+    Cached for 60 seconds; authentication reads through
+    get_user_by_username.uncached so credential changes apply immediately.
+    The user admin functions below invalidate the cache when they change a row.
+    """
     with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM users WHERE username = ? AND is_active = 1", (username,))
         return cursor.fetchone()
 
+def invalidate_user_cache(username=None):
+    """Drop cached user rows after user admin changes (all users if username is None)"""
+    if username:
+        invalidate("user", username)
+    else:
+        invalidate("user")
+    invalidate("investigator_names")
+
+# Columns update_user may change; "password" is stored as its hash
+USER_UPDATABLE_FIELDS = ["password", "role", "email", "name", "team", "functional_designation",
+                         "referred_by", "all_roles_access", "is_active"]
+
+def create_user(username, password, role, email=None, name=None, team=None,
+                functional_designation=None, referred_by=None, all_roles_access=False):
+    """Create a user account"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO users (username, password_hash, role, email, name, team,
+                               functional_designation, referred_by, all_roles_access)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (username, get_password_hash(password), role, email, name, team,
+              functional_designation, referred_by, 1 if all_roles_access else 0))
+        conn.commit()
+    invalidate_user_cache(username)
+
+def update_user(username, **fields):
+    """Update a user's role, profile, password or active flag"""
+    unknown = set(fields) - set(USER_UPDATABLE_FIELDS)
+    if unknown:
+        raise ValueError(f"Cannot update user fields: {', '.join(sorted(unknown))}")
+    if not fields:
+        return
+    if "password" in fields:
+        fields["password_hash"] = get_password_hash(fields.pop("password"))
+    assignments = ", ".join(f"{column} = ?" for column in fields)
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"UPDATE users SET {assignments} WHERE username = ?", (*fields.values(), username))
+        conn.commit()
+    invalidate_user_cache(username)
+
+def set_user_active(username, is_active):
+    """Activate or deactivate a user account"""
+    update_user(username, is_active=1 if is_active else 0)
+
 def get_user_role(username):
     """Get user role"""
     user = get_user_by_username(username)
@@ -60,29 +115,39 @@ def create_case(case_data, created_by):
             case_data.get("disbursement_date", "")
         ))
         
-        conn.commit()
+        # The creation audit row records the initial status, so it commits with the case
+        log_audit(case_data["case_id"], "Case Created", f"Case created with status: {case_data.get('status', 'Draft')}", created_by, conn=conn)
         
-        # Log audit
-        log_audit(case_data["case_id"], "Case Created", f"Case created with status: {case_data.get('status', 'Draft')}", created_by)
+        conn.commit()
+        invalidate("case", case_data["case_id"])
         
         return True, "Case created successfully"
 
+def _case_owner_conditions(status=None, created_by=None):
+    """Build SQL conditions and params for the status/creator filters"""
+    conditions = []
+    params = []
+    
+    if status:
+        conditions.append("status = ?")
+        params.append(status)
+    
+    if created_by:
+        conditions.append("created_by = ?")
+        params.append(created_by)
+    
+    return conditions, params
+
 def get_cases_by_status(status=None, created_by=None):
-    """Get cases by status and/or creator"""
+    """Get cases by status and/or creator
+
+    Returns every matching row; use get_cases_page for list views.
+    """
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
         query = "SELECT * FROM cases"
-        params = []
-        conditions = []
-        
-        if status:
-            conditions.append("status = ?")
-            params.append(status)
-        
-        if created_by:
-            conditions.append("created_by = ?")
-            params.append(created_by)
+        conditions, params = _case_owner_conditions(status, created_by)
         
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
@@ -92,6 +157,84 @@ def get_cases_by_status(status=None, created_by=None):
         cursor.execute(query, params)
         return cursor.fetchall()
 
+# Default projection for case list views
+CASE_LIST_COLUMNS = [
+    "id", "case_id", "lan", "case_type", "product", "region", "status",
+    "customer_name", "branch_location", "loan_amount", "case_date",
+    "created_by", "created_at", "updated_at",
+]
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def encode_page_token(created_at, row_id):
+    """Encode a (created_at, id) keyset position as an opaque token"""
+    payload = json.dumps([created_at, row_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_page_token(page_token):
+    """Decode a token produced by encode_page_token"""
+    try:
+        padded = page_token + "=" * (-len(page_token) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return created_at, int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid page token")
+
+def _case_projection(conn, columns, alias):
+    """Validate a column projection and make sure it carries the keyset"""
+    if not columns:
+        return f"{alias}.*"
+    
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(cases)")
+    known_columns = {row[1] for row in cursor.fetchall()}
+    unknown = [column for column in columns if column not in known_columns]
+    if unknown:
+        raise ValueError(f"Unknown case columns: {', '.join(unknown)}")
+    
+    selected = list(dict.fromkeys(list(columns) + ["id", "created_at"]))
+    return ", ".join(f"{alias}.{column}" for column in selected)
+
+def _fetch_case_page(conn, from_clause, conditions, params, page_size, page_token, columns, alias):
+    """Run a keyset-paginated query ordered by (created_at, id) descending"""
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    conditions = list(conditions)
+    params = list(params)
+    
+    if page_token:
+        created_at, row_id = decode_page_token(page_token)
+        conditions.append(f"({alias}.created_at, {alias}.id) < (?, ?)")
+        params.extend([created_at, row_id])
+    
+    query = f"SELECT {_case_projection(conn, columns, alias)} {from_clause}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {alias}.created_at DESC, {alias}.id DESC LIMIT ?"
+    params.append(page_size + 1)
+    
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    
+    next_token = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_token = encode_page_token(rows[-1]["created_at"], rows[-1]["id"])
+    return rows, next_token
+
+def get_cases_page(status=None, created_by=None, page_size=DEFAULT_PAGE_SIZE, page_token=None, columns=None):
+    """Get one page of cases by status and/or creator, newest first
+
+    Returns (rows, next_page_token); next_page_token is None on the last page.
+    Pass columns (e.g. CASE_LIST_COLUMNS) to fetch only what a list view shows.
+    """
+    with get_db_connection() as conn:
+        conditions, params = _case_owner_conditions(status, created_by)
+        return _fetch_case_page(conn, "FROM cases", conditions, params,
+                                page_size, page_token, columns, alias="cases")
+
+@cached_query("case", ttl=15)
 def get_case_by_id(case_id):
     """Get case by case_id"""
     with get_db_connection() as conn:
@@ -101,53 +244,13 @@ def get_case_by_id(case_id):
 
 def update_case_status(case_id, new_status, updated_by, comments=None):
     """Update case status"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        # Update case status
-        update_fields = ["status = ?", "updated_at = CURRENT_TIMESTAMP"]
-        params = [new_status]
-        
-        # Add specific reviewer fields based on status
-        if new_status == "Under Review":
-            update_fields.append("reviewed_by = ?")
-            update_fields.append("reviewed_at = CURRENT_TIMESTAMP")
-            params.append(updated_by)
-        elif new_status == "Approved":
-            update_fields.append("approved_by = ?")
-            update_fields.append("approved_at = CURRENT_TIMESTAMP")
-            params.append(updated_by)
-        elif new_status == "Legal Review":
-            update_fields.append("legal_reviewed_by = ?")
-            update_fields.append("legal_reviewed_at = CURRENT_TIMESTAMP")
-            params.append(updated_by)
-        elif new_status == "Closed":
-            update_fields.append("closed_by = ?")
-            update_fields.append("closed_at = CURRENT_TIMESTAMP")
-            params.append(updated_by)
-        
-        params.append(case_id)
-        
-        cursor.execute(f'''
-            UPDATE cases 
-            SET {", ".join(update_fields)}
-            WHERE case_id = ?
-        ''', params)
-        
-        # Add comment if provided
-        if comments:
-            cursor.execute('''
-                INSERT INTO case_comments (case_id, comment, comment_type, created_by)
-                VALUES (?, ?, ?, ?)
-            ''', (case_id, comments, f"Status Change to {new_status}", updated_by))
-        
-        conn.commit()
-        
-        # Log audit
-        log_audit(case_id, "Status Update", f"Status changed to: {new_status}", updated_by)
-        
-        return True
+    return transition_case_status(case_id, new_status, updated_by, comments)
+
+def bulk_update_case_status(case_ids, new_status, updated_by, comments=None):
+    """Update the status of many cases at once, returning the number updated"""
+    return bulk_transition_case_status(case_ids, new_status, updated_by, comments)
 
+@cached_query("case_comments", ttl=15)
 def get_case_comments(case_id):
     """Get comments for a case"""
     with get_db_connection() as conn:
@@ -168,6 +271,7 @@ def add_case_comment(case_id, comment, comment_type, created_by):
             VALUES (?, ?, ?, ?)
         ''', (case_id, comment, comment_type, created_by))
         conn.commit()
+        invalidate("case_comments", case_id)
         
         # Log audit
         log_audit(case_id, "Comment Added", f"Comment type: {comment_type}", created_by)
@@ -196,28 +300,51 @@ def add_case_document(case_id, filename, original_filename, file_path, file_size
         # Log audit
         log_audit(case_id, "Document Added", f"Document: {original_filename}", uploaded_by)
 
+def get_document_case_id(file_path):
+    """Get the case that owns an uploaded file, or None if no document row references it"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        for table in ("documents", "case_documents"):
+            cursor.execute(f"SELECT case_id FROM {table} WHERE file_path = ? LIMIT 1", (file_path,))
+            row = cursor.fetchone()
+            if row:
+                return row[0]
+        return None
+
 def get_case_statistics():
-    """Get case statistics for dashboard"""
+    """Get case statistics for dashboard
+
+    Counts come from the trigger-maintained case_stats table; databases
+    without it are aggregated directly from cases.
+    """
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
-        stats = {}
-        
-        # Total cases
-        cursor.execute("SELECT COUNT(*) FROM cases")
-        stats["total_cases"] = cursor.fetchone()[0]
-        
-        # Cases by status
-        cursor.execute("SELECT status, COUNT(*) FROM cases GROUP BY status")
-        stats["by_status"] = dict(cursor.fetchall())
-        
-        # Cases by region
-        cursor.execute("SELECT region, COUNT(*) FROM cases GROUP BY region")
-        stats["by_region"] = dict(cursor.fetchall())
+        stats = {"total_cases": 0, "by_status": {}, "by_region": {}, "by_product": {}}
         
-        # Cases by product
-        cursor.execute("SELECT product, COUNT(*) FROM cases GROUP BY product")
-        stats["by_product"] = dict(cursor.fetchall())
+        try:
+            cursor.execute("SELECT dimension, value, case_count FROM case_stats WHERE case_count > 0")
+            for dimension, value, case_count in cursor.fetchall():
+                if dimension == "total":
+                    stats["total_cases"] = case_count
+                else:
+                    stats[f"by_{dimension}"][value if value != "" else None] = case_count
+        except sqlite3.OperationalError:
+            # Total cases
+            cursor.execute("SELECT COUNT(*) FROM cases")
+            stats["total_cases"] = cursor.fetchone()[0]
+            
+            # Cases by status
+            cursor.execute("SELECT status, COUNT(*) FROM cases GROUP BY status")
+            stats["by_status"] = dict(cursor.fetchall())
+            
+            # Cases by region
+            cursor.execute("SELECT region, COUNT(*) FROM cases GROUP BY region")
+            stats["by_region"] = dict(cursor.fetchall())
+            
+            # Cases by product
+            cursor.execute("SELECT product, COUNT(*) FROM cases GROUP BY product")
+            stats["by_product"] = dict(cursor.fetchall())
         
         # Recent cases
         cursor.execute("SELECT * FROM cases ORDER BY created_at DESC LIMIT 10")
@@ -227,6 +354,9 @@ def get_case_statistics():
 
 def get_audit_logs(case_id=None, limit=100):
     """Get audit logs"""
+    # Make rows still queued in the background writer visible to this read
+    flush_audit_log()
+    
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
@@ -248,37 +378,74 @@ def get_audit_logs(case_id=None, limit=100):
 
 
 
+def _case_filter_conditions(filters, alias="cases"):
+    """Build SQL conditions and params for the search filters"""
+    conditions = []
+    params = []
+    
+    if filters:
+        if filters.get("status"):
+            conditions.append(f"{alias}.status = ?")
+            params.append(filters["status"])
+        
+        if filters.get("region"):
+            conditions.append(f"{alias}.region = ?")
+            params.append(filters["region"])
+        
+        if filters.get("product"):
+            conditions.append(f"{alias}.product = ?")
+            params.append(filters["product"])
+        
+        if filters.get("date_from"):
+            conditions.append(f"{alias}.case_date >= ?")
+            params.append(filters["date_from"])
+        
+        if filters.get("date_to"):
+            conditions.append(f"{alias}.case_date <= ?")
+            params.append(filters["date_to"])
+    
+    return conditions, params
+
+def _build_fts_query(search_term):
+    """Turn free text into an FTS5 query matching every word as a prefix"""
+    words = str(search_term or "").split()
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+
 def search_cases(search_term, filters=None):
-    """Search cases with optional filters"""
+    """Search cases with optional filters
+
+    Uses the cases_fts full-text index (prefix matching, bm25 ranking) and
+    falls back to LIKE matching when the index is unavailable.
+    """
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
+        match_query = _build_fts_query(search_term)
+        if match_query:
+            conditions, params = _case_filter_conditions(filters, alias="c")
+            query = '''
+                SELECT c.* FROM cases_fts
+                JOIN cases c ON c.id = cases_fts.rowid
+                WHERE cases_fts MATCH ?
+            '''
+            for condition in conditions:
+                query += f" AND {condition}"
+            query += " ORDER BY bm25(cases_fts), c.created_at DESC"
+            
+            try:
+                cursor.execute(query, [match_query] + params)
+                return cursor.fetchall()
+            except sqlite3.OperationalError:
+                pass  # No FTS5 index in this database, use LIKE matching
+        
+        conditions, params = _case_filter_conditions(filters)
         query = '''
             SELECT * FROM cases 
             WHERE (case_id LIKE ? OR lan LIKE ? OR case_description LIKE ?)
         '''
-        params = [f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"]
-        
-        if filters:
-            if filters.get("status"):
-                query += " AND status = ?"
-                params.append(filters["status"])
-            
-            if filters.get("region"):
-                query += " AND region = ?"
-                params.append(filters["region"])
-            
-            if filters.get("product"):
-                query += " AND product = ?"
-                params.append(filters["product"])
-            
-            if filters.get("date_from"):
-                query += " AND case_date >= ?"
-                params.append(filters["date_from"])
-            
-            if filters.get("date_to"):
-                query += " AND case_date <= ?"
-                params.append(filters["date_to"])
+        params = [f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"] + params
+        for condition in conditions:
+            query += f" AND {condition}"
         
         query += " ORDER BY created_at DESC"
         
@@ -286,6 +453,32 @@ def search_cases(search_term, filters=None):
         return cursor.fetchall()
 
 
+def search_cases_page(search_term, filters=None, page_size=DEFAULT_PAGE_SIZE, page_token=None, columns=None):
+    """Get one page of search results, newest first
+
+    Unlike search_cases, results are ordered by (created_at, id) rather than
+    relevance so that pages stay stable. Returns (rows, next_page_token).
+    """
+    with get_db_connection() as conn:
+        match_query = _build_fts_query(search_term)
+        if match_query:
+            conditions, params = _case_filter_conditions(filters, alias="c")
+            try:
+                return _fetch_case_page(
+                    conn, "FROM cases_fts JOIN cases c ON c.id = cases_fts.rowid",
+                    ["cases_fts MATCH ?"] + conditions, [match_query] + params,
+                    page_size, page_token, columns, alias="c"
+                )
+            except sqlite3.OperationalError:
+                pass  # No FTS5 index in this database, use LIKE matching
+        
+        conditions, params = _case_filter_conditions(filters, alias="c")
+        conditions.insert(0, "(c.case_id LIKE ? OR c.lan LIKE ? OR c.case_description LIKE ?)")
+        params = [f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"] + params
+        return _fetch_case_page(conn, "FROM cases c", conditions, params,
+                                page_size, page_token, columns, alias="c")
+
+
 # Achievement and Gamification Functions
 def get_user_achievements(username):
     """Get user's earned achievements"""
@@ -303,6 +496,42 @@ def get_user_achievements(username):
         except:
             return []  # Return empty if tables don't exist yet
 
+def _get_user_case_counts(username, conn):
+    """Get (total cases handled, cases this month) for a user
+
+    Reads the trigger-maintained user_case_counts table, falling back to
+    scanning cases on databases without it.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT COALESCE(SUM(case_count), 0),
+                   COALESCE(SUM(CASE WHEN month = strftime('%Y-%m', 'now') THEN case_count END), 0)
+            FROM user_case_counts
+            WHERE username = ?
+        ''', (username,))
+        total_cases, cases_this_month = cursor.fetchone()
+        return total_cases, cases_this_month
+    except sqlite3.OperationalError:
+        pass
+    
+    # Total cases handled
+    cursor.execute('''
+        SELECT COUNT(*) FROM cases 
+        WHERE created_by = ? OR reviewed_by = ? OR approved_by = ? OR closed_by = ?
+    ''', (username, username, username, username))
+    total_cases = cursor.fetchone()[0]
+    
+    # Cases this month
+    cursor.execute('''
+        SELECT COUNT(*) FROM cases 
+        WHERE (created_by = ? OR reviewed_by = ? OR approved_by = ? OR closed_by = ?)
+        AND created_at >= date('now', 'start of month')
+    ''', (username, username, username, username))
+    cases_this_month = cursor.fetchone()[0]
+    
+    return total_cases, cases_this_month
+
 def get_user_stats(username):
     """Get comprehensive user statistics for gamification"""
     with get_db_connection() as conn:
@@ -310,20 +539,8 @@ def get_user_stats(username):
         
         stats = {}
         
-        # Total cases handled
-        cursor.execute('''
-            SELECT COUNT(*) FROM cases 
-            WHERE created_by = ? OR reviewed_by = ? OR approved_by = ? OR closed_by = ?
-        ''', (username, username, username, username))
-        stats["total_cases"] = cursor.fetchone()[0]
-        
-        # Cases this month
-        cursor.execute('''
-            SELECT COUNT(*) FROM cases 
-            WHERE (created_by = ? OR reviewed_by = ? OR approved_by = ? OR closed_by = ?)
-            AND created_at >= date('now', 'start of month')
-        ''', (username, username, username, username))
-        stats["cases_this_month"] = cursor.fetchone()[0]
+        # Cases handled, in total and this month
+        stats["total_cases"], stats["cases_this_month"] = _get_user_case_counts(username, conn)
         
         # Mock values for demo
         stats["avg_resolution_time"] = 2.3
@@ -351,8 +568,20 @@ def get_user_stats(username):
         
         return stats
 
+# Leaderboard case scores read from the per-user counters, by type_filter
+_LEADERBOARD_CASE_MONTH_FILTERS = {
+    "cases_this_month": "AND ucc.month = strftime('%Y-%m', 'now')",
+    "cases_all_time": "",
+}
+
+@cached_query("leaderboard", ttl=60)
 def get_leaderboard(type_filter="overall_points"):
-    """Get leaderboard data"""
+    """Get leaderboard data
+
+    Case leaderboards are built from the user_case_counts counters, so their
+    cost depends on the number of users rather than cases. Results are
+    cached for a minute, which acts as a periodically refreshed snapshot.
+    """
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
@@ -369,7 +598,25 @@ def get_leaderboard(type_filter="overall_points"):
                     ORDER BY score DESC
                     LIMIT 20
                 ''')
-            elif type_filter == "cases_this_month":
+                return cursor.fetchall()
+            
+            month_filter = _LEADERBOARD_CASE_MONTH_FILTERS.get(type_filter, "")
+            try:
+                cursor.execute(f'''
+                    SELECT u.username, u.name, u.team,
+                           COALESCE(SUM(ucc.case_count), 0) as score
+                    FROM users u
+                    LEFT JOIN user_case_counts ucc ON ucc.username = u.username {month_filter}
+                    WHERE u.is_active = 1
+                    GROUP BY u.username, u.name, u.team
+                    ORDER BY score DESC
+                    LIMIT 20
+                ''')
+                return cursor.fetchall()
+            except sqlite3.OperationalError:
+                pass  # No counters table yet, count from cases directly
+            
+            if type_filter == "cases_this_month":
                 cursor.execute('''
                     SELECT u.username, u.name, u.team,
                            COUNT(c.id) as score
@@ -399,30 +646,42 @@ def get_leaderboard(type_filter="overall_points"):
         except:
             return []
 
+# Achievements earned once a user has handled at least this many cases
+CASE_COUNT_ACHIEVEMENTS = [
+    ("first_case", 1),
+    ("cases_5", 5),
+    ("cases_10", 10),
+    ("cases_25", 25),
+    ("cases_50", 50),
+    ("cases_100", 100),
+]
+
 def check_and_award_achievements(username, action_type, case_data=None):
-    """Check if user qualifies for new achievements and award them"""
+    """Check if user qualifies for new achievements and award them
+
+    Thresholds are compared (>=) against the user's case counters, and
+    awards are idempotent, so a missed event is picked up on the next one.
+    """
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            # Get user's current stats
-            stats = get_user_stats(username)
-            
-            # Check various achievement conditions
-            achievements_to_award = []
-            
-            # First Case achievement
-            if stats["total_cases"] == 1:
-                achievements_to_award.append("first_case")
+            total_cases, _ = _get_user_case_counts(username, conn)
             
-            # Case milestones
-            case_milestones = [5, 10, 25, 50, 100]
-            if stats["total_cases"] in case_milestones:
-                achievements_to_award.append(f"cases_{stats['total_cases']}")
+            achievements_to_award = [
+                (username, achievement_id)
+                for achievement_id, threshold in CASE_COUNT_ACHIEVEMENTS
+                if total_cases >= threshold
+            ]
             
-            # Award achievements
-            for achievement_id in achievements_to_award:
-                award_achievement(username, achievement_id, conn)
+            if achievements_to_award:
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO user_achievements (username, achievement_id, earned_at)
+                    VALUES (?, ?, CURRENT_TIMESTAMP)
+                ''', achievements_to_award)
+                conn.commit()
+                if cursor.rowcount > 0:
+                    invalidate("leaderboard")
     except:
         pass  # Fail silently if achievement system not ready
 
@@ -0,0 +1,287 @@
+"""
+Provider Dispatch Module
+Asyncio dispatcher for blocking verification providers with timeouts, circuit breakers, hedging and latency stats
+"""
+
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+PROVIDER_DISPATCH_WORKERS = int(os.environ.get("PROVIDER_DISPATCH_WORKERS", "16"))
+PROVIDER_DEFAULT_TIMEOUT = float(os.environ.get("PROVIDER_DEFAULT_TIMEOUT", "15"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.environ.get("CIRCUIT_RESET_SECONDS", "30"))
+HEDGE_DEFAULT_DELAY = float(os.environ.get("HEDGE_DEFAULT_DELAY", "2.0"))
+HEDGE_MIN_DELAY = float(os.environ.get("HEDGE_MIN_DELAY", "0.25"))
+HEDGE_MIN_SAMPLES = int(os.environ.get("HEDGE_MIN_SAMPLES", "20"))
+LATENCY_WINDOW = 500
+
+# Provider calls block on network or model inference, so they run on a
+# shared thread pool and asyncio only coordinates deadlines and races
+_executor = ThreadPoolExecutor(max_workers=PROVIDER_DISPATCH_WORKERS, thread_name_prefix="provider")
+
+class ProviderUnavailable(Exception):
+    """Raised when a provider's circuit is open"""
+
+class ProviderStats:
+    """Rolling latency window plus success, error and timeout counters for one provider"""
+
+    def __init__(self):
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.successes = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.abandoned = 0
+
+    def record(self, outcome, latency=None):
+        self.calls += 1
+        if outcome == 'success':
+            self.successes += 1
+        elif outcome == 'timeout':
+            self.timeouts += 1
+        else:
+            self.errors += 1
+        if latency is not None and outcome == 'success':
+            self._latencies.append(latency)
+
+    def record_abandoned(self, latency=None):
+        """A call that finished after its caller gave up (hedge loser or timeout)
+
+        latency is given only for valid answers, matching record(), which
+        keeps invalid results out of the latency window.
+        """
+        self.abandoned += 1
+        if latency is not None:
+            self._latencies.append(latency)
+
+    def percentile(self, fraction):
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def snapshot(self):
+        return {
+            'calls': self.calls,
+            'successes': self.successes,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'rejected_by_circuit': self.rejected,
+            'abandoned': self.abandoned,
+            'error_rate': round((self.errors + self.timeouts) / self.calls, 4) if self.calls else 0.0,
+            'p50_ms': round(self.percentile(0.50) * 1000, 1) if self._latencies else None,
+            'p95_ms': round(self.percentile(0.95) * 1000, 1) if self._latencies else None,
+            'p99_ms': round(self.percentile(0.99) * 1000, 1) if self._latencies else None,
+        }
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets one trial call through after a cool-down"""
+
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_seconds=CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half_open' and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+class ProviderDispatcher:
+    """Runs blocking provider functions with per-provider deadlines, breakers and stats"""
+
+    def __init__(self, timeouts=None, is_valid=None):
+        """
+        Args:
+            timeouts: Dict of provider name -> timeout in seconds
+            is_valid: Callable(result) deciding whether a provider answer counts as a success
+        """
+        self.timeouts = dict(timeouts or {})
+        self.is_valid = is_valid or (lambda result: True)
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._breakers = {}
+
+    def timeout_for(self, name):
+        override = os.environ.get(f"PROVIDER_TIMEOUT_{name.upper()}")
+        if override:
+            return float(override)
+        return self.timeouts.get(name, PROVIDER_DEFAULT_TIMEOUT)
+
+    def _state(self, name):
+        with self._lock:
+            if name not in self._stats:
+                self._stats[name] = ProviderStats()
+                self._breakers[name] = CircuitBreaker()
+            return self._stats[name], self._breakers[name]
+
+    def _finish(self, name, outcome, latency=None):
+        stats, breaker = self._state(name)
+        with self._lock:
+            stats.record(outcome, latency)
+            if outcome == 'success':
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+
+    async def call(self, name, func, *args):
+        """Run one provider call under its timeout and circuit breaker"""
+        stats, breaker = self._state(name)
+        with self._lock:
+            allowed = breaker.allow()
+            if not allowed:
+                stats.rejected += 1
+        if not allowed:
+            raise ProviderUnavailable(f"{name} circuit is open")
+
+        started = time.perf_counter()
+        work = _executor.submit(func, *args)
+
+        def on_work_done(future):
+            # Only attached once the caller has given up. Slow calls that lost
+            # a hedge race or timed out still finish in the pool; their
+            # latency belongs in the window, or the p95 used for hedging only
+            # ever sees the fast calls
+            if future.cancelled() or future.exception() is not None:
+                return
+            latency = time.perf_counter() - started if self.is_valid(future.result()) else None
+            with self._lock:
+                stats.record_abandoned(latency)
+
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(work), timeout=self.timeout_for(name))
+        except asyncio.TimeoutError:
+            work.add_done_callback(on_work_done)
+            self._finish(name, 'timeout')
+            raise
+        except asyncio.CancelledError:
+            # Lost a hedge race; say nothing about the provider's health
+            work.add_done_callback(on_work_done)
+            with self._lock:
+                breaker.trial_in_flight = False
+            raise
+        except Exception:
+            self._finish(name, 'error')
+            raise
+
+        latency = time.perf_counter() - started
+        self._finish(name, 'success' if self.is_valid(result) else 'error', latency)
+        return result
+
+    def hedge_delay(self, name):
+        """Delay before hedging a call: the provider's observed p95, once enough samples exist"""
+        stats, _ = self._state(name)
+        with self._lock:
+            if stats.successes < HEDGE_MIN_SAMPLES:
+                return HEDGE_DEFAULT_DELAY
+            return max(HEDGE_MIN_DELAY, stats.percentile(0.95))
+
+    async def first_valid(self, calls, hedge=False):
+        """
+        Return (name, result, errors) from the first provider with a valid answer
+
+        Args:
+            calls: Ordered list of (name, func, args) tuples, primary first
+            hedge: Start the next provider once the current one has run for
+                   its p95 latency, instead of only after it fails
+
+        Providers are otherwise tried in order, each one as soon as the
+        previous fails, times out or has an open circuit. errors maps each
+        provider that did not produce the answer to its failure reason.
+        """
+        errors = {}
+        pending = {}
+        remaining = list(calls)
+        last_result = None
+
+        def start_next():
+            name, func, args = remaining.pop(0)
+            pending[asyncio.ensure_future(self.call(name, func, *args))] = name
+
+        start_next()
+        try:
+            while pending:
+                timeout = None
+                if hedge and remaining:
+                    timeout = self.hedge_delay(list(pending.values())[-1])
+                done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Hedge: current provider is slower than its p95
+                    start_next()
+                    continue
+
+                for task in done:
+                    name = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except asyncio.TimeoutError:
+                        errors[name] = f"timed out after {self.timeout_for(name)}s"
+                        continue
+                    except Exception as e:
+                        errors[name] = str(e)
+                        continue
+                    if self.is_valid(result):
+                        return name, result, errors
+                    last_result = (name, result)
+                    errors[name] = result.get('error', 'invalid result') if isinstance(result, dict) else 'invalid result'
+
+                if not pending and remaining:
+                    start_next()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if last_result is not None:
+            return last_result[0], last_result[1], errors
+        return None, None, errors
+
+    def stats(self):
+        """Per-provider latency percentiles, error counts and circuit state"""
+        with self._lock:
+            snapshot = {}
+            for name, stats in self._stats.items():
+                entry = stats.snapshot()
+                entry['circuit'] = self._breakers[name].state
+                entry['timeout_s'] = self.timeout_for(name)
+                snapshot[name] = entry
+            return snapshot
+
+def run_sync(coroutine):
+    """Run a coroutine to completion from synchronous code such as a Streamlit script"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    # Already inside an event loop: run on a private loop in another thread
+    return _executor.submit(asyncio.run, coroutine).result()
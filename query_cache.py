@@ -0,0 +1,145 @@
+"""
+Query Cache Module
+Process-wide TTL cache for read-mostly model queries, shared by all Streamlit sessions
+"""
+
+import os
+import time
+import inspect
+import functools
+import threading
+from collections import OrderedDict
+
+QUERY_CACHE_ENABLED = os.environ.get("QUERY_CACHE_ENABLED", "1") != "0"
+QUERY_CACHE_MAX_ENTRIES = int(os.environ.get("QUERY_CACHE_MAX_ENTRIES", "5000"))
+
+class QueryCache:
+    """Thread-safe TTL cache partitioned into namespaces with hit/miss counters"""
+
+    def __init__(self, max_entries=QUERY_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._generations = {}
+
+    def _count(self, namespace, counter):
+        counters = self._counters.setdefault(namespace, {"hits": 0, "misses": 0, "invalidations": 0})
+        counters[counter] += 1
+
+    def get(self, namespace, key):
+        """Return (True, value) for a fresh entry, otherwise (False, None)"""
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end((namespace, key))
+                self._count(namespace, "hits")
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[(namespace, key)]
+            self._count(namespace, "misses")
+            return False, None
+
+    def generation(self, namespace):
+        """Counter bumped on every invalidation of a namespace"""
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def set(self, namespace, key, value, ttl, generation=None):
+        """Store a value for ttl seconds, evicting the least recently used entry when full
+
+        If generation is given and the namespace has been invalidated since
+        it was read, the value may be stale and is not stored.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generations.get(namespace, 0):
+                return
+            self._entries[(namespace, key)] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, namespace, key=None):
+        """Drop one key, or the whole namespace when key is None"""
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            if key is not None:
+                self._entries.pop((namespace, key), None)
+            else:
+                for entry_key in [k for k in self._entries if k[0] == namespace]:
+                    del self._entries[entry_key]
+            self._count(namespace, "invalidations")
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Per-namespace hit, miss, invalidation and size counters"""
+        with self._lock:
+            sizes = {}
+            for namespace, _ in self._entries:
+                sizes[namespace] = sizes.get(namespace, 0) + 1
+            stats = {}
+            for namespace in set(self._counters) | set(sizes):
+                counters = dict(self._counters.get(namespace, {"hits": 0, "misses": 0, "invalidations": 0}))
+                lookups = counters["hits"] + counters["misses"]
+                counters["entries"] = sizes.get(namespace, 0)
+                counters["hit_rate"] = counters["hits"] / lookups if lookups else 0.0
+                stats[namespace] = counters
+            return stats
+
+_cache = QueryCache()
+
+def _copy_value(value):
+    """Copy nested lists, dicts and sets; leaves (sqlite3.Row, str, numbers) are immutable and shared"""
+    if isinstance(value, list):
+        return [_copy_value(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _copy_value(item) for key, item in value.items()}
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+def cached_query(namespace, ttl):
+    """Cache a query function's result per argument tuple for ttl seconds
+
+    Arguments are normalized against the function signature, so
+    invalidate(namespace, *args) matches calls made positionally or by
+    keyword. Lists, dicts and sets are copied at every nesting level on the
+    way out so callers cannot mutate the shared entry.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not QUERY_CACHE_ENABLED:
+                return func(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = bound.args
+            hit, value = _cache.get(namespace, key)
+            if not hit:
+                generation = _cache.generation(namespace)
+                value = func(*args, **kwargs)
+                _cache.set(namespace, key, value, ttl, generation)
+            return _copy_value(value)
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+def invalidate(namespace, *args):
+    """Invalidate the entry cached for these arguments, or the whole namespace if none given"""
+    _cache.invalidate(namespace, tuple(args) if args else None)
+
+def clear_query_cache():
+    """Drop every cached query result"""
+    _cache.clear()
+
+def get_cache_stats():
+    """Hit/miss statistics for each cached query namespace"""
+    return _cache.stats()
@@ -0,0 +1,35 @@
+"""
+Rate Limit Module
+Token-bucket rate limiting and jittered backoff shared by the external API clients
+"""
+
+import time
+import random
+import threading
+
+class TokenBucket:
+    """Thread-safe token bucket limiting calls to rate per second with bursts up to capacity"""
+    
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a token is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+def backoff_delay(attempt, base=0.5, cap=8.0):
+    """Exponential backoff with full jitter for the given zero-based retry attempt"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
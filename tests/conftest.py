@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+# Modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class StubResponse:
+    usage_metadata = None
+
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModels:
+    """Answers generate_content / generate_content_stream from a reply function"""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    def generate_content(self, **kwargs):
+        self.calls.append(kwargs)
+        return StubResponse(self.reply(kwargs))
+
+    def generate_content_stream(self, **kwargs):
+        self.calls.append(kwargs)
+        return iter(StubResponse(chunk) for chunk in self.reply(kwargs))
+
+
+class StubClient:
+    def __init__(self, reply):
+        self.models = StubModels(reply)
+
+
+@pytest.fixture
+def stub_client():
+    """Factory for a Gemini client stub; reply(kwargs) returns the response text (or chunks when streaming)"""
+    return StubClient
+
+
+@pytest.fixture(autouse=True)
+def no_gemini_metrics(monkeypatch):
+    # Keep tests from writing gemini_metrics.db into the working tree
+    from gemini_metrics import gemini_metrics
+    monkeypatch.setattr(gemini_metrics, "enabled", False)
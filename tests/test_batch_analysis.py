@@ -0,0 +1,37 @@
+import io
+import json
+
+from PIL import Image
+
+import gemini_verification_services as services
+
+
+def jpeg_bytes(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_batch_reports_errors_in_results_and_rates_attempted_documents(monkeypatch, stub_client):
+    def fail_render(*args, **kwargs):
+        raise AssertionError("batch workers must not render to Streamlit")
+    monkeypatch.setattr(services.st, "error", fail_render)
+
+    client = stub_client(lambda kwargs: json.dumps({"quality_assessment": {"image_quality": "good"}}))
+    service = services.GeminiVerificationServices(gemini_client=client)
+    documents = [
+        {"name": "pan.jpg", "type": "image/jpeg", "bytes": jpeg_bytes("white")},
+        {"name": "broken.jpg", "type": "image/jpeg", "bytes": None},
+        {"name": "statement.pdf", "type": "application/pdf", "bytes": b"%PDF"},
+        {"name": "aadhaar.jpg", "type": "image/jpeg", "bytes": jpeg_bytes("gray")},
+    ]
+
+    seen = []
+    results = service.multi_document_batch_analysis(documents, {}, on_result=seen.append)
+
+    assert results["success"]
+    assert (results["success_count"], results["failed_count"], results["skipped_count"]) == (2, 1, 1)
+    assert results["batch_summary"]["success_rate"] == 2 / 3 * 100
+    assert [entry["file_name"] for entry in results["processing_results"]] == ["pan.jpg", "broken.jpg", "aadhaar.jpg"]
+    assert "Failed to prepare image" in results["processing_results"][1]["error"]
+    assert len(seen) == 3 and len(client.models.calls) == 2
@@ -0,0 +1,41 @@
+import json
+
+from google.genai import types
+
+import gemini_verification_services as services
+from gemini_cache import GeminiResponseCache, make_cache_key
+
+CONFIG = types.GenerateContentConfig(response_mime_type="application/json", temperature=0.1)
+
+
+def image_part(data):
+    return types.Part.from_bytes(data=data, mime_type="image/jpeg")
+
+
+def test_cache_key_covers_model_prompt_params_and_images():
+    key = make_cache_key("m", [image_part(b"a"), "prompt"], CONFIG)
+    assert key == make_cache_key("m", [image_part(b"a"), "prompt"], CONFIG)
+    assert key != make_cache_key("m2", [image_part(b"a"), "prompt"], CONFIG)
+    assert key != make_cache_key("m", [image_part(b"b"), "prompt"], CONFIG)
+    assert key != make_cache_key("m", [image_part(b"a"), "other prompt"], CONFIG)
+    other_config = types.GenerateContentConfig(response_mime_type="application/json", temperature=0.5)
+    assert key != make_cache_key("m", [image_part(b"a"), "prompt"], other_config)
+
+
+def test_identity_calls_hit_the_in_memory_cache_only_when_asked(monkeypatch, stub_client):
+    cache = GeminiResponseCache(":memory:", ttl=60, max_bytes=1024 * 1024)
+    monkeypatch.setattr(services, "gemini_identity_cache", cache)
+    client = stub_client(lambda kwargs: json.dumps({"linkage_status": "LINKED"}))
+    service = services.GeminiVerificationServices(gemini_client=client)
+
+    first = service.pan_aadhaar_linkage_verification("ABCDE1234F", "123412341234", "A", bypass_cache=False)
+    second = service.pan_aadhaar_linkage_verification("ABCDE1234F", "123412341234", "A", bypass_cache=False)
+    assert (first["from_cache"], second["from_cache"]) == (False, True)
+    assert second["linkage_status"] == "LINKED"
+    assert len(client.models.calls) == 1
+
+    # Different input misses; the default bypasses the cache entirely
+    service.pan_aadhaar_linkage_verification("ABCDE1234G", "123412341234", "A", bypass_cache=False)
+    assert service.pan_aadhaar_linkage_verification("ABCDE1234F", "123412341234", "A")["from_cache"] is False
+    assert len(client.models.calls) == 3
+    assert not services.gemini_identity_cache.persistent
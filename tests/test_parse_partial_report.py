@@ -0,0 +1,59 @@
+import json
+
+from gemini_verification_services import GeminiVerificationServices, PartialReportParser, parse_partial_report
+
+REPORT = {
+    "report_id": "R1",
+    "detailed_findings": [
+        {"category": "risk_assessment", "status": "FLAGGED", "details": "\"conclusion\": inside text"}
+    ],
+    "risk_assessment": {"risk_score": 0.4, "risk_factors": ["address mismatch"]},
+    "conclusion": "Review required"
+}
+
+
+def test_section_names_inside_values_are_not_sections():
+    sections = parse_partial_report(json.dumps(REPORT))
+    assert sections == REPORT
+
+
+def test_partial_stream_returns_only_completed_sections():
+    text = json.dumps(REPORT, indent=2)
+    cut = text.index('"risk_factors"')
+    sections = parse_partial_report(text[:cut])
+    assert sections == {"report_id": "R1", "detailed_findings": REPORT["detailed_findings"]}
+
+
+def test_trailing_number_is_incomplete():
+    assert parse_partial_report('{"conclusion": 0.5') == {}
+    assert parse_partial_report('{"conclusion": 0.5,') == {"conclusion": 0.5}
+
+
+def test_split_escapes_and_numbers_across_chunks():
+    text = json.dumps({"executive_summary": "a \\\" quote", "conclusion": 0.75, "report_id": "R2"})
+    parser = PartialReportParser()
+    for char in text:
+        parser.feed(char)
+    assert parser.sections == json.loads(text)
+    assert parser.finished
+
+
+def test_stream_verification_report_sections_arrive_as_completed(stub_client):
+    text = json.dumps(REPORT, indent=2)
+    chunks = [text[i:i + 16] for i in range(0, len(text), 16)]
+    services = GeminiVerificationServices(gemini_client=stub_client(lambda kwargs: chunks))
+
+    parser = PartialReportParser()
+    received = []
+    completed_at = {}
+    for chunk in services.stream_verification_report({"case_id": 1}):
+        received.append(chunk)
+        for name in parser.feed(chunk):
+            completed_at[name] = len(received)
+
+    assert "".join(received) == text
+    assert services.client.models.calls[0]["model"] == "gemini-2.0-flash-exp"
+    assert parser.sections == REPORT
+    # Each section is reported once, as soon as its value closes
+    assert list(completed_at) == list(REPORT)
+    assert completed_at["report_id"] < completed_at["conclusion"] == len(chunks)
@@ -0,0 +1,19 @@
+from query_cache import cached_query, invalidate
+
+calls = []
+
+
+@cached_query("test_options", ttl=60)
+def get_options():
+    calls.append(1)
+    return {"regions": ["North", "South"], "nested": [{"names": ["a"]}]}
+
+
+def test_callers_cannot_mutate_the_cached_value():
+    invalidate("test_options")
+    first = get_options()
+    first["regions"].append("East")
+    first["nested"][0]["names"].clear()
+    second = get_options()
+    assert second == {"regions": ["North", "South"], "nested": [{"names": ["a"]}]}
+    assert len(calls) == 1
@@ -1,8 +1,10 @@
 import random
 import string
 import os
+import logging
 import uuid
 from datetime import datetime
+from query_cache import cached_query
 
 def generate_case_id():
     """Generate auto case ID in format: CASE20250728CE806A"""
@@ -137,6 +139,14 @@ def validate_case_data(case_data):
     
     return errors
 
+def queue_face_indexing(file_path, case_id):
+    """Hand a saved upload to the face index worker; indexing problems never fail the save"""
+    try:
+        from face_index import index_face_image_async
+        index_face_image_async(file_path, case_id)
+    except Exception as e:
+        logging.error(f"Error queueing face indexing for {file_path}: {e}")
+
 def save_identity_document(uploaded_file, case_id, doc_type):
     """Save identity document with specific naming convention"""
     try:
@@ -154,12 +164,14 @@ def save_identity_document(uploaded_file, case_id, doc_type):
         with open(file_path, "wb") as f:
             f.write(uploaded_file.getbuffer())
 
-        return True, unique_filename
-
     except Exception as e:
         print(f"Error saving identity document: {e}")
         return False, None
 
+    # Add face photos to the repeat-fraud face index in the background
+    queue_face_indexing(file_path, case_id)
+    return True, unique_filename
+
 def save_uploaded_file(uploaded_file, case_id):
     """Save uploaded file to uploads directory"""
     import os
@@ -183,16 +195,20 @@ def save_uploaded_file(uploaded_file, case_id):
         with open(file_path, "wb") as f:
             f.write(uploaded_file.getbuffer())
         
-        return {
-            "file_path": file_path,
-            "original_filename": uploaded_file.name,
-            "file_size": uploaded_file.size,
-            "unique_filename": unique_filename
-        }, None
-        
     except Exception as e:
         return None, f"Error saving file: {str(e)}"
+    
+    # Add face photos to the repeat-fraud face index in the background
+    queue_face_indexing(file_path, case_id)
+    
+    return {
+        "file_path": file_path,
+        "original_filename": uploaded_file.name,
+        "file_size": uploaded_file.size,
+        "unique_filename": unique_filename
+    }, None
 
+@cached_query("dropdown_options", ttl=3600)
 def get_dropdown_options():
     """Get dropdown options for form fields"""
     return {